@@ -38,6 +38,9 @@ class BackupSystem:
         self.temp_dir.mkdir(exist_ok=True)
         self.logger = logging.getLogger(__name__)
 
+        # Version incrémentée à chaque sauvegarde journalisée
+        self.version = 0
+
         # Configuration depuis variables d'environnement
         self.retention_days = int(os.getenv('BACKUP_RETENTION_DAYS', '30'))
         self.max_backups = int(os.getenv('MAX_BACKUPS', '10'))
@@ -510,6 +513,7 @@ class BackupSystem:
                     )
                     db.session.add(log_entry)
                     db.session.commit()
+                    self.version += 1
 
                     # Envoyer une notification de succès
                     self._send_backup_notification('success', backup_type, file_path, file_size)
@@ -530,6 +534,7 @@ class BackupSystem:
                     )
                     db.session.add(log_entry)
                     db.session.commit()
+                    self.version += 1
 
                     # Envoyer une notification d'échec
                     self._send_backup_notification('failure', backup_type, None, 0, error_message)
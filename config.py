@@ -18,6 +18,8 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,
+        # Lignes par instruction INSERT multi-VALUES des insertions groupées
+        'insertmanyvalues_page_size': 1000,
     }
 
     # File upload
@@ -191,6 +193,14 @@ def get_config():
     instance.PORT = int(os.getenv('PORT', '5000'))
     instance.DEBUG = os.getenv('DEBUG', 'false' if env == 'production' else 'true').lower() == 'true'
 
+    # Insertions groupées rapides pour psycopg2 (options refusées par les autres pilotes)
+    if instance.SQLALCHEMY_DATABASE_URI.startswith(('postgresql://', 'postgresql+psycopg2://')):
+        instance.SQLALCHEMY_ENGINE_OPTIONS = {
+            **instance.SQLALCHEMY_ENGINE_OPTIONS,
+            'executemany_mode': 'values_plus_batch',
+            'executemany_batch_page_size': 500,
+        }
+
     # Configuration des chemins
     instance.BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     instance.STATIC_FOLDER = os.path.join(instance.BASE_DIR, 'static')
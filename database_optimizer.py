@@ -5,7 +5,9 @@ Profilage, optimisation des requêtes, et gestion des performances
 """
 import os
 import time
+import atexit
 import logging
+import threading
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import psycopg2
@@ -13,14 +15,108 @@ import sqlite3
 from contextlib import contextmanager
 from typing import Dict, List, Optional, Any, Tuple
 import json
-from pathlib import Path
 
 from models import db
 from config import get_config
 from monitoring_config import get_monitoring_integration
 
+# Dépendances optionnelles, importées une seule fois
+try:
+    import psutil
+    psutil_available = True
+except ImportError:
+    psutil_available = False
+
+try:
+    from redis_cache import cache_manager, get_cache_stats, clear_cache
+    cache_available = True
+except ImportError:
+    cache_available = False
+
+try:
+    from backup_system import backup_system
+    backup_available = True
+except ImportError:
+    backup_available = False
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
 logger = logging.getLogger(__name__)
 
+# Répertoire et chemin des rapports, préparés une seule fois à l'import
+os.makedirs('logs', exist_ok=True)
+
+# Rapports de performances en JSON Lines, rotation par taille
+_REPORT_PATH = os.path.join('logs', 'performance_reports.jsonl')
+_REPORT_MAX_BYTES = 10485760  # 10MB
+_REPORT_BACKUP_COUNT = 5
+
+# Pénalités du score de performance: (seuil, pénalité) du plus au moins sévère
+_SCORE_PENALTIES = {
+    'cpu_usage': ((80, 20), (60, 10)),
+    'memory_usage': ((85, 20), (70, 10)),
+    'disk_usage': ((90, 15), (80, 5))
+}
+
+class ReportWriter:
+    """Écrivain JSON Lines en ajout, ouvert une seule fois par processus
+
+    Les lignes restent dans le tampon de 64 Ko jusqu'à la rotation ou la fermeture
+    (atexit): en cas d'arrêt brutal, les derniers rapports non vidés sont perdus.
+    """
+
+    def __init__(self, path: str, max_bytes: int = _REPORT_MAX_BYTES, backup_count: int = _REPORT_BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        """Ajouter un enregistrement sur une ligne"""
+        if orjson_available:
+            line = orjson.dumps(record, default=str,
+                                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        else:
+            line = json.dumps(record, default=str).encode('utf-8') + b'\n'
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'ab', buffering=65536)
+
+            if self._file.tell() + len(line) > self.max_bytes:
+                self._rotate()
+
+            self._file.write(line)
+
+    def _rotate(self):
+        """Faire tourner les fichiers comme RotatingFileHandler"""
+        self._file.close()
+
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+
+        if os.path.exists(self.path):
+            os.replace(self.path, f'{self.path}.1')
+
+        self._file = open(self.path, 'ab', buffering=65536)
+
+    def close(self):
+        """Fermer le fichier courant"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+report_writer = ReportWriter(_REPORT_PATH)
+atexit.register(report_writer.close)
+
 class QueryProfiler:
     """Profileur de requêtes SQL"""
 
@@ -123,6 +219,9 @@ class QueryProfiler:
 class DatabaseOptimizer:
     """Optimiseur de base de données complet"""
 
+    # Version du schéma partagée entre instances, incrémentée à chaque création d'index
+    schema_version = 0
+
     def __init__(self, app=None):
         self.app = app
         self.profiler = QueryProfiler(app)
@@ -480,6 +579,7 @@ class DatabaseOptimizer:
 
             conn.commit()
             conn.close()
+            DatabaseOptimizer.schema_version += 1
 
             return {
                 'success': len(errors) == 0,
@@ -545,6 +645,7 @@ class DatabaseOptimizer:
 
             conn.commit()
             conn.close()
+            DatabaseOptimizer.schema_version += 1
 
             return {
                 'success': len(errors) == 0,
@@ -642,6 +743,19 @@ class PerformanceOptimizer:
             'memory_limit_mb': int(os.getenv('MEMORY_LIMIT_MB', '512'))
         }
 
+        # Score de performance maintenu incrémentalement à chaque échantillon
+        self._score = 100
+        self._last_penalties = {metric: 0 for metric in _SCORE_PENALTIES}
+        self._score_sampled = False
+
+        # Dernier rapport et clé des états dont il dépend
+        self._last_report = None
+        self._last_report_key = None
+
+        # Statistiques de cache mémorisées brièvement (horodatage monotone, stats)
+        self._cache_stats = None
+        self._cache_stats_ttl = 1.0
+
     def run_comprehensive_optimization(self) -> Dict:
         """Exécuter une optimisation complète"""
         try:
@@ -695,7 +809,8 @@ class PerformanceOptimizer:
     def _optimize_cache_performance(self) -> Dict:
         """Optimiser les performances du cache"""
         try:
-            from redis_cache import cache_manager
+            if not cache_available:
+                return {'success': False, 'error': 'Cache non disponible'}
 
             # Analyser les performances du cache
             stats = cache_manager.get_stats()
@@ -726,7 +841,8 @@ class PerformanceOptimizer:
     def _optimize_memory_usage(self) -> Dict:
         """Optimiser l'utilisation mémoire"""
         try:
-            import psutil
+            if not psutil_available:
+                return {'success': False, 'error': 'psutil non disponible'}
 
             process = psutil.Process()
             memory_info = process.memory_info()
@@ -741,8 +857,7 @@ class PerformanceOptimizer:
                 optimizations.append("Mémoire élevée détectée - optimisation recommandée")
 
                 # Vider les caches si nécessaire
-                from redis_cache import clear_cache
-                cache_cleared = clear_cache('temp')
+                cache_cleared = cache_available and clear_cache('temp')
 
                 if cache_cleared:
                     optimizations.append("Cache temporaire vidé")
@@ -760,7 +875,8 @@ class PerformanceOptimizer:
     def _optimize_backup_performance(self) -> Dict:
         """Optimiser les performances de sauvegarde"""
         try:
-            from backup_system import backup_system
+            if not backup_available:
+                return {'success': False, 'error': 'Système de sauvegarde non disponible'}
 
             # Analyser les performances de sauvegarde
             backup_status = backup_system.get_backup_status()
@@ -768,18 +884,13 @@ class PerformanceOptimizer:
             optimizations = []
 
             # Optimisations basées sur l'historique
-            if backup_status:
-                recent_backups = [b for b in backup_status if b.get('status') == 'success'][-5:]
+            recent = self._summarize_recent_backups(backup_status, 5)
 
-                if recent_backups:
-                    avg_duration = sum(
-                        (datetime.fromisoformat(b.get('completed_at', datetime.utcnow().isoformat())) -
-                         datetime.fromisoformat(b.get('started_at', datetime.utcnow().isoformat()))).total_seconds()
-                        for b in recent_backups
-                    ) / len(recent_backups)
+            if recent['timed_count']:
+                avg_duration = recent['total_duration'] / recent['timed_count']
 
-                    if avg_duration > 300:  # Plus de 5 minutes
-                        optimizations.append("Sauvegardes lentes détectées - optimisation recommandée")
+                if avg_duration > 300:  # Plus de 5 minutes
+                    optimizations.append("Sauvegardes lentes détectées - optimisation recommandée")
 
             return {
                 'success': True,
@@ -793,21 +904,43 @@ class PerformanceOptimizer:
     def generate_performance_report(self) -> Dict:
         """Générer un rapport de performances"""
         try:
-            report = {
-                'generated_at': datetime.utcnow().isoformat(),
-                'system_performance': self._get_system_performance(),
-                'database_performance': self.db_optimizer.analyze_database_performance(),
-                'cache_performance': self._get_cache_performance(),
-                'memory_performance': self._get_memory_performance(),
-                'backup_performance': self._get_backup_performance(),
-                'optimization_recommendations': self._get_optimization_recommendations(),
-                'performance_score': self._calculate_performance_score()
-            }
+            # Un seul échantillon système partagé par tout le rapport
+            system_perf = self._get_system_performance()
+
+            report_key = self._get_report_state_key()
+
+            if report_key == self._last_report_key:
+                # États inchangés: ne rafraîchir que les sections qui évoluent toujours
+                report = dict(self._last_report)
+                report.update({
+                    'generated_at': datetime.utcnow().isoformat(),
+                    'system_performance': system_perf,
+                    'memory_performance': self._get_memory_performance(),
+                    'optimization_recommendations': self._get_optimization_recommendations(
+                        system_perf, report['database_performance'], report['cache_performance']
+                    ),
+                    'performance_score': self._calculate_performance_score()
+                })
+            else:
+                db_perf = self.db_optimizer.analyze_database_performance()
+                cache_perf = self._get_cache_performance()
+
+                report = {
+                    'generated_at': datetime.utcnow().isoformat(),
+                    'system_performance': system_perf,
+                    'database_performance': db_perf,
+                    'cache_performance': cache_perf,
+                    'memory_performance': self._get_memory_performance(),
+                    'backup_performance': self._get_backup_performance(),
+                    'optimization_recommendations': self._get_optimization_recommendations(system_perf, db_perf, cache_perf),
+                    'performance_score': self._calculate_performance_score()
+                }
+
+            self._last_report = report
+            self._last_report_key = report_key
 
             # Sauvegarder le rapport
-            report_file = Path('logs') / f'performance_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            with open(report_file, 'w') as f:
-                json.dump(report, f, indent=2)
+            report_writer.write(report)
 
             return report
 
@@ -815,31 +948,53 @@ class PerformanceOptimizer:
             self.logger.error(f"Erreur génération rapport performances: {e}")
             return {'error': str(e)}
 
+    def _get_report_state_key(self) -> Tuple:
+        """Clé des états suivis par le rapport"""
+        return (
+            backup_system.version if backup_available else 0,
+            cache_manager.generation if cache_available else 0,
+            self.db_optimizer.schema_version,
+            int(time.time()) // 60
+        )
+
     def _get_system_performance(self) -> Dict:
         """Obtenir les métriques de performance système"""
         try:
-            import psutil
+            if not psutil_available:
+                return {'error': 'psutil non disponible'}
 
             cpu_percent = psutil.cpu_percent(interval=1)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
 
-            return {
+            system_perf = {
                 'cpu_usage': cpu_percent,
                 'memory_usage': memory.percent,
                 'disk_usage': disk.percent,
                 'load_average': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0, 0, 0]
             }
 
+            self._update_performance_score(system_perf)
+
+            return system_perf
+
         except Exception as e:
             return {'error': str(e)}
 
     def _get_cache_performance(self) -> Dict:
         """Obtenir les métriques de performance du cache"""
         try:
-            from redis_cache import get_cache_stats
+            if not cache_available:
+                return {'error': 'Cache non disponible'}
+
+            now = time.monotonic()
+            if self._cache_stats and now - self._cache_stats[0] < self._cache_stats_ttl:
+                return self._cache_stats[1]
 
-            return get_cache_stats()
+            stats = get_cache_stats()
+            self._cache_stats = (now, stats)
+
+            return stats
 
         except Exception as e:
             return {'error': str(e)}
@@ -847,7 +1002,8 @@ class PerformanceOptimizer:
     def _get_memory_performance(self) -> Dict:
         """Obtenir les métriques de performance mémoire"""
         try:
-            import psutil
+            if not psutil_available:
+                return {'error': 'psutil non disponible'}
 
             process = psutil.Process()
             memory_info = process.memory_info()
@@ -866,36 +1022,63 @@ class PerformanceOptimizer:
     def _get_backup_performance(self) -> Dict:
         """Obtenir les métriques de performance des sauvegardes"""
         try:
-            from backup_system import backup_system
+            if not backup_available:
+                return {'error': 'Système de sauvegarde non disponible'}
 
             status = backup_system.get_backup_status()
+            recent = self._summarize_recent_backups(status, 10)
 
-            if status:
-                recent_backups = [b for b in status if b.get('status') == 'success'][-10:]
-
-                if recent_backups:
-                    total_size = sum(b.get('file_size', 0) for b in recent_backups)
-                    avg_size = total_size / len(recent_backups)
+            if recent['count']:
+                total_size = recent['total_size']
 
-                    return {
-                        'recent_backups_count': len(recent_backups),
-                        'total_size_mb': total_size / 1024 / 1024,
-                        'average_size_mb': avg_size / 1024 / 1024,
-                        'success_rate': len(recent_backups) / len(status) if status else 0
-                    }
+                return {
+                    'recent_backups_count': recent['count'],
+                    'total_size_mb': total_size / 1024 / 1024,
+                    'average_size_mb': total_size / recent['count'] / 1024 / 1024,
+                    'success_rate': recent['count'] / len(status)
+                }
 
             return {'no_recent_backups': True}
 
         except Exception as e:
             return {'error': str(e)}
 
-    def _get_optimization_recommendations(self) -> List[str]:
+    def _summarize_recent_backups(self, status: List[Dict], limit: int) -> Dict:
+        """Résumer en une seule passe les dernières sauvegardes réussies"""
+        summary = {'count': 0, 'total_size': 0, 'total_duration': 0.0, 'timed_count': 0}
+
+        # Le statut est trié du plus récent au plus ancien
+        for backup in status or []:
+            if backup.get('status') != 'success':
+                continue
+
+            summary['count'] += 1
+            summary['total_size'] += backup.get('file_size') or 0
+
+            started_at = backup.get('started_at')
+            completed_at = backup.get('completed_at')
+            if started_at and completed_at:
+                summary['total_duration'] += (
+                    datetime.fromisoformat(completed_at) - datetime.fromisoformat(started_at)
+                ).total_seconds()
+                summary['timed_count'] += 1
+
+            if summary['count'] >= limit:
+                break
+
+        return summary
+
+    def _get_optimization_recommendations(self, system_perf: Optional[Dict] = None,
+                                          db_perf: Optional[Dict] = None,
+                                          cache_perf: Optional[Dict] = None) -> List[str]:
         """Obtenir les recommandations d'optimisation"""
         recommendations = []
 
         try:
-            # Recommandations système
-            system_perf = self._get_system_performance()
+            # Recommandations système (réutiliser l'échantillon fourni)
+            if system_perf is None:
+                system_perf = self._get_system_performance()
+
             if system_perf.get('cpu_usage', 0) > 80:
                 recommendations.append("CPU élevé - envisager l'optimisation des requêtes ou l'augmentation des ressources")
 
@@ -903,12 +1086,16 @@ class PerformanceOptimizer:
                 recommendations.append("Mémoire élevée - vérifier les fuites mémoire")
 
             # Recommandations base de données
-            db_perf = self.db_optimizer.analyze_database_performance()
+            if db_perf is None:
+                db_perf = self.db_optimizer.analyze_database_performance()
+
             if 'optimization_recommendations' in db_perf:
                 recommendations.extend(db_perf['optimization_recommendations'][:3])  # Top 3
 
             # Recommandations cache
-            cache_perf = self._get_cache_performance()
+            if cache_perf is None:
+                cache_perf = self._get_cache_performance()
+
             if cache_perf.get('memory_cache', {}).get('size', 0) > 500:
                 recommendations.append("Cache mémoire volumineux - envisager l'ajustement des TTL")
 
@@ -917,36 +1104,28 @@ class PerformanceOptimizer:
 
         return recommendations
 
+    def _update_performance_score(self, system_perf: Dict):
+        """Appliquer au score la variation de pénalité des métriques échantillonnées"""
+        for metric, thresholds in _SCORE_PENALTIES.items():
+            if metric not in system_perf:
+                continue
+
+            value = system_perf[metric]
+            penalty = next((p for threshold, p in thresholds if value > threshold), 0)
+
+            self._score += self._last_penalties[metric] - penalty
+            self._last_penalties[metric] = penalty
+
+        self._score_sampled = True
+
     def _calculate_performance_score(self) -> int:
         """Calculer un score de performance global (0-100)"""
         try:
-            score = 100
-
-            # Pénalités basées sur les métriques
-            system_perf = self._get_system_performance()
+            # Premier appel sans échantillon: sonder une fois pour initialiser le score
+            if not self._score_sampled:
+                self._get_system_performance()
 
-            # Pénalité CPU
-            cpu_usage = system_perf.get('cpu_usage', 0)
-            if cpu_usage > 80:
-                score -= 20
-            elif cpu_usage > 60:
-                score -= 10
-
-            # Pénalité mémoire
-            memory_usage = system_perf.get('memory_usage', 0)
-            if memory_usage > 85:
-                score -= 20
-            elif memory_usage > 70:
-                score -= 10
-
-            # Pénalité disque
-            disk_usage = system_perf.get('disk_usage', 0)
-            if disk_usage > 90:
-                score -= 15
-            elif disk_usage > 80:
-                score -= 5
-
-            return max(0, score)
+            return max(0, self._score)
 
         except Exception:
             return 50  # Score par défaut
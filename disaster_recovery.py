@@ -5,24 +5,164 @@ Procédures de récupération automatique et manuelle
 """
 import os
 import json
-import shutil
+import time
+import signal
+import threading
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
 import subprocess
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlparse, unquote
 import logging
-import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-import tempfile
 
-from backup_system import backup_system
-from monitoring_config import get_monitoring_integration
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
 
 logger = logging.getLogger(__name__)
 
+# Modèles des scripts de récupération: (script installé, modèle source), dans l'ordre
+_RECOVERY_TEMPLATES_DIR = Path(__file__).resolve().parent / 'recovery_templates'
+_RECOVERY_SCRIPT_TEMPLATES = {
+    'recover_database.sh': 'recover_database.sh.tmpl',
+    'recover_files.sh': 'recover_files.sh.tmpl',
+    'recover_full.sh': 'recover_full.sh.tmpl',
+    'verify_recovery.sh': 'verify_recovery.sh.tmpl'
+}
+
+# Délais maximaux des commandes externes (secondes), ajustables par l'environnement
+_TIMEOUT_SYSTEMCTL = int(os.getenv('DR_SYSTEMCTL_TIMEOUT', '30'))
+_TIMEOUT_SYSTEMCTL_SLOW = int(os.getenv('DR_SYSTEMCTL_SLOW_TIMEOUT', '60'))
+_TIMEOUT_SQLITE = int(os.getenv('DR_SQLITE_TIMEOUT', '60'))
+_TIMEOUT_PSQL = int(os.getenv('DR_PSQL_TIMEOUT', '300'))
+
+# Attente maximale de l'arrêt des processus après SIGTERM, avant SIGKILL
+_TERMINATE_GRACE_SEC = float(os.getenv('DR_TERMINATE_GRACE_SEC', '5'))
+
+# Poids de chaque indicateur dans le score de sévérité
+_INDICATOR_WEIGHTS = {
+    'database_unavailable': 30,
+    'high_error_rate': 25,
+    'high_cpu_usage': 15,
+    'high_memory_usage': 15,
+    'low_disk_space': 20,
+    'security_incident': 25
+}
+
+# Paliers de sévérité (score minimal, niveau) triés par score croissant
+_SEVERITY_BRACKETS = ((20, 'medium'), (40, 'high'), (70, 'critical'))
+_SEVERITY_THRESHOLDS = tuple(threshold for threshold, _ in _SEVERITY_BRACKETS)
+
+# Recommandations de récupération: (indicateurs déclencheurs, recommandations)
+_RECOVERY_RECOMMENDATIONS = (
+    (frozenset(('database_unavailable',)), (
+        "Restaurer la base de données depuis la dernière sauvegarde",
+        "Vérifier la connectivité réseau à la base de données"
+    )),
+    (frozenset(('high_error_rate',)), (
+        "Analyser les erreurs dans les logs récents",
+        "Vérifier la charge du serveur et les ressources disponibles"
+    )),
+    (frozenset(('high_cpu_usage', 'high_memory_usage')), (
+        "Redémarrer les services non essentiels",
+        "Vérifier les processus zombies"
+    )),
+    (frozenset(('low_disk_space',)), (
+        "Libérer de l'espace disque",
+        "Archiver les anciens logs et sauvegardes"
+    )),
+    (frozenset(('security_incident',)), (
+        "Activer le mode sécurité renforcée",
+        "Auditer les accès récents"
+    ))
+)
+
+# Recommandations générales par sévérité: (en-tête, recommandations finales)
+_SEVERITY_RECOMMENDATIONS = {
+    'critical': ("🚨 DÉSASTRE CRITIQUE DÉTECTÉ - Action immédiate requise", (
+        "Contacter l'équipe technique d'urgence",
+        "Préparer la restauration complète du système"
+    )),
+    'high': ("⚠️ Problème majeur détecté - Intervention nécessaire", (
+        "Surveiller l'évolution de la situation",
+    ))
+}
+
+def _accessor(keys: tuple, default=None):
+    """Créer un accesseur précompilé vers une valeur imbriquée des métriques"""
+    getters = tuple(itemgetter(key) for key in keys)
+
+    def accessor(data):
+        try:
+            for getter in getters:
+                data = getter(data)
+        except (KeyError, TypeError, IndexError):
+            return default
+        return default if data is None else data
+
+    return accessor
+
+# Accesseurs des signaux lus par la détection de désastre
+_get_db_healthy = _accessor(('database', 'stats', 'connection_healthy'), True)
+_get_cpu_usage = _accessor(('system', 'cpu', 'percent'), 0)
+_get_memory_usage = _accessor(('system', 'memory', 'percent'), 0)
+_get_disk_usage = _accessor(('system', 'disk', 'percent'), 0)
+_get_security_score = _accessor(('security', 'events', 'security_score'), 100)
+_get_log_analysis = _accessor(('application', 'performance', 'log_analysis'), {})
+
+def _run(cmd: list, timeout: int, want_stderr: bool = True, **kwargs) -> subprocess.CompletedProcess:
+    """Exécuter une commande dont la sortie standard n'est pas exploitée"""
+    return subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE if want_stderr else subprocess.DEVNULL,
+                          text=True, timeout=timeout, **kwargs)
+
+def _alive(pid: int) -> bool:
+    """Indiquer si un processus est encore en vie (zombies enfants récoltés)"""
+    try:
+        reaped_pid, _ = os.waitpid(pid, os.WNOHANG)
+        return reaped_pid == 0
+    except ChildProcessError:
+        pass
+
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def _write_exec(path: Path, data: bytes):
+    """Écrire un fichier exécutable via un seul descripteur (création, écriture, mode)"""
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+    try:
+        # Mode forcé sur le descripteur: indépendant de l'umask et des fichiers existants
+        os.fchmod(fd, 0o755)
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def _bullets(items: list) -> str:
+    """Formater une liste en puces pour le corps d'un email"""
+    return ("\n- " + "\n- ".join(items)) if items else "\n(aucune)"
+
 class DisasterRecoveryManager:
     """Gestionnaire de récupération après désastre"""
 
+    __slots__ = (
+        'app', 'recovery_scripts_dir', 'logger', 'disaster_thresholds',
+        '_err_threshold', '_res_threshold', '_sec_threshold',
+        '_detect_ttl', '_last_detection', '_last_error_counters', '_last_error_rate',
+        '_backup_cache', '_smtp', '_smtp_lock', '_consec', '_consec_min'
+    )
+
     def __init__(self, app=None):
         self.app = app
         self.recovery_scripts_dir = Path('recovery_scripts')
@@ -37,58 +177,92 @@ class DisasterRecoveryManager:
             'security_incident_score': int(os.getenv('SECURITY_THRESHOLD', '80'))
         }
 
+        # Seuils lus à chaque détection, exposés en attributs simples
+        self._err_threshold = self.disaster_thresholds['high_error_rate_percent']
+        self._res_threshold = self.disaster_thresholds['system_resource_exhaustion_percent']
+        self._sec_threshold = self.disaster_thresholds['security_incident_score']
+
+        # Cache de détection: (horodatage monotone, résultat, empreinte des signaux)
+        self._detect_ttl = float(os.getenv('DISASTER_DETECT_TTL_SEC', '15'))
+        self._last_detection = None
+        self._last_error_counters = None
+        self._last_error_rate = 0.0
+
+        # Détections consécutives par ensemble d'indicateurs (filtre anti-pics isolés)
+        self._consec = Counter()
+        self._consec_min = int(os.getenv('DISASTER_CONSEC_MIN', '2'))
+
+        # Dernière sauvegarde trouvée, invalidée par le mtime du répertoire
+        self._backup_cache = {'dir_mtime': None, 'latest': None, 'latest_mtime': 0.0}
+
+        # Connexion SMTP authentifiée réutilisée entre les rapports
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+
     def detect_disaster(self, system_metrics: dict) -> Dict:
         """Détecter si une situation de désastre est en cours"""
         try:
+            now = time.monotonic()
+
+            # Signaux surveillés
+            db_healthy = _get_db_healthy(system_metrics)
+            cpu_usage = _get_cpu_usage(system_metrics)
+            memory_usage = _get_memory_usage(system_metrics)
+            disk_usage = _get_disk_usage(system_metrics)
+            security_score = _get_security_score(system_metrics)
+
+            # Ne recalculer le taux d'erreur que si les compteurs de logs ont changé
+            log_analysis = _get_log_analysis(system_metrics)
+            error_counters = (log_analysis.get('error_count', 0), log_analysis.get('total_lines', 1))
+            if error_counters != self._last_error_counters:
+                self._last_error_rate = self._calculate_error_rate(system_metrics)
+                self._last_error_counters = error_counters
+            error_rate = self._last_error_rate
+
+            # Réutiliser la dernière détection si aucun seuil n'a été franchi
+            fingerprint = (
+                not db_healthy,
+                error_rate > self._err_threshold,
+                cpu_usage > self._res_threshold,
+                memory_usage > self._res_threshold,
+                disk_usage > self._res_threshold,
+                security_score < self._sec_threshold
+            )
+            if self._last_detection:
+                detected_at, last_result, last_fingerprint = self._last_detection
+                if now - detected_at < self._detect_ttl and fingerprint == last_fingerprint:
+                    return self._with_consecutive_count(last_result)
+
             disaster_indicators = []
-            severity_score = 0
 
             # Vérifier la disponibilité de la base de données
-            db_healthy = system_metrics.get('database', {}).get('stats', {}).get('connection_healthy', True)
             if not db_healthy:
                 disaster_indicators.append('database_unavailable')
-                severity_score += 30
 
             # Vérifier le taux d'erreur
-            error_rate = self._calculate_error_rate(system_metrics)
-            if error_rate > self.disaster_thresholds['high_error_rate_percent']:
+            if error_rate > self._err_threshold:
                 disaster_indicators.append('high_error_rate')
-                severity_score += 25
 
             # Vérifier l'utilisation des ressources système
-            cpu_usage = system_metrics.get('system', {}).get('cpu', {}).get('percent', 0)
-            memory_usage = system_metrics.get('system', {}).get('memory', {}).get('percent', 0)
-            disk_usage = system_metrics.get('system', {}).get('disk', {}).get('percent', 0)
-
-            if cpu_usage > self.disaster_thresholds['system_resource_exhaustion_percent']:
+            if cpu_usage > self._res_threshold:
                 disaster_indicators.append('high_cpu_usage')
-                severity_score += 15
 
-            if memory_usage > self.disaster_thresholds['system_resource_exhaustion_percent']:
+            if memory_usage > self._res_threshold:
                 disaster_indicators.append('high_memory_usage')
-                severity_score += 15
 
-            if disk_usage > self.disaster_thresholds['system_resource_exhaustion_percent']:
+            if disk_usage > self._res_threshold:
                 disaster_indicators.append('low_disk_space')
-                severity_score += 20
 
             # Vérifier le score de sécurité
-            security_score = system_metrics.get('security', {}).get('events', {}).get('security_score', 100)
-            if security_score < self.disaster_thresholds['security_incident_score']:
+            if security_score < self._sec_threshold:
                 disaster_indicators.append('security_incident')
-                severity_score += 25
 
             # Déterminer le niveau de sévérité
-            if severity_score >= 70:
-                disaster_level = 'critical'
-            elif severity_score >= 40:
-                disaster_level = 'high'
-            elif severity_score >= 20:
-                disaster_level = 'medium'
-            else:
-                disaster_level = 'low'
+            severity_score = sum(_INDICATOR_WEIGHTS[indicator] for indicator in disaster_indicators)
+            bracket = bisect_right(_SEVERITY_THRESHOLDS, severity_score) - 1
+            disaster_level = _SEVERITY_BRACKETS[bracket][1] if bracket >= 0 else 'low'
 
-            return {
+            result = {
                 'disaster_detected': len(disaster_indicators) > 0,
                 'severity': disaster_level,
                 'severity_score': severity_score,
@@ -97,6 +271,10 @@ class DisasterRecoveryManager:
                 'recommendations': self._get_recovery_recommendations(disaster_indicators, disaster_level)
             }
 
+            self._last_detection = (now, result, fingerprint)
+
+            return self._with_consecutive_count(result)
+
         except Exception as e:
             self.logger.error(f"Erreur détection désastre: {e}")
             return {
@@ -104,10 +282,35 @@ class DisasterRecoveryManager:
                 'error': str(e)
             }
 
+    @staticmethod
+    def _fingerprint(indicators: list) -> int:
+        """Empreinte d'un ensemble d'indicateurs, indépendante de l'ordre"""
+        return hash(tuple(sorted(indicators)))
+
+    def _with_consecutive_count(self, result: dict) -> Dict:
+        """Compter les détections consécutives et indiquer si la récupération doit être lancée"""
+        result = dict(result)
+
+        if not result['disaster_detected']:
+            self._consec.clear()
+            result['consecutive_detections'] = 0
+            result['should_recover'] = False
+            return result
+
+        # Seul l'ensemble d'indicateurs courant conserve son compteur
+        fp = self._fingerprint(result['indicators'])
+        count = self._consec[fp] + 1
+        self._consec.clear()
+        self._consec[fp] = count
+
+        result['consecutive_detections'] = count
+        result['should_recover'] = count >= self._consec_min
+        return result
+
     def _calculate_error_rate(self, metrics: dict) -> float:
         """Calculer le taux d'erreur actuel"""
         try:
-            log_analysis = metrics.get('application', {}).get('performance', {}).get('log_analysis', {})
+            log_analysis = _get_log_analysis(metrics)
             error_count = log_analysis.get('error_count', 0)
             total_lines = log_analysis.get('total_lines', 1)
 
@@ -118,46 +321,29 @@ class DisasterRecoveryManager:
 
     def _get_recovery_recommendations(self, indicators: list, severity: str) -> List[str]:
         """Obtenir les recommandations de récupération"""
-        recommendations = []
-
-        if 'database_unavailable' in indicators:
-            recommendations.append("Restaurer la base de données depuis la dernière sauvegarde")
-            recommendations.append("Vérifier la connectivité réseau à la base de données")
-
-        if 'high_error_rate' in indicators:
-            recommendations.append("Analyser les erreurs dans les logs récents")
-            recommendations.append("Vérifier la charge du serveur et les ressources disponibles")
-
-        if 'high_cpu_usage' in indicators or 'high_memory_usage' in indicators:
-            recommendations.append("Redémarrer les services non essentiels")
-            recommendations.append("Vérifier les processus zombies")
-
-        if 'low_disk_space' in indicators:
-            recommendations.append("Libérer de l'espace disque")
-            recommendations.append("Archiver les anciens logs et sauvegardes")
-
-        if 'security_incident' in indicators:
-            recommendations.append("Activer le mode sécurité renforcée")
-            recommendations.append("Auditer les accès récents")
+        # Ensemble construit une seule fois: tests d'appartenance en O(1)
+        active = frozenset(indicators)
+        specific = chain.from_iterable(
+            recommendations for triggers, recommendations in _RECOVERY_RECOMMENDATIONS
+            if not triggers.isdisjoint(active)
+        )
 
         # Recommandations générales selon la sévérité
-        if severity == 'critical':
-            recommendations.insert(0, "🚨 DÉSASTRE CRITIQUE DÉTECTÉ - Action immédiate requise")
-            recommendations.append("Contacter l'équipe technique d'urgence")
-            recommendations.append("Préparer la restauration complète du système")
-
-        elif severity == 'high':
-            recommendations.insert(0, "⚠️ Problème majeur détecté - Intervention nécessaire")
-            recommendations.append("Surveiller l'évolution de la situation")
+        if severity in _SEVERITY_RECOMMENDATIONS:
+            header, closing = _SEVERITY_RECOMMENDATIONS[severity]
+            return [header, *specific, *closing]
 
-        return recommendations
+        return list(specific)
 
-    def initiate_automatic_recovery(self, disaster_info: dict) -> Dict:
+    def initiate_automatic_recovery(self, disaster_info: dict, system_metrics: dict = None) -> Dict:
         """Initier la récupération automatique"""
         try:
+            # Horodatage unique partagé par le résultat, le rapport et le statut
+            timestamp = datetime.utcnow().isoformat()
+
             recovery_result = {
                 'recovery_initiated': True,
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': timestamp,
                 'actions_taken': [],
                 'success': True,
                 'errors': []
@@ -179,7 +365,7 @@ class DisasterRecoveryManager:
                 recovery_result.update(self._execute_minor_recovery())
 
             # Créer un rapport de récupération
-            self._create_recovery_report(recovery_result)
+            self._create_recovery_report(recovery_result, timestamp, system_metrics)
 
             return recovery_result
 
@@ -197,22 +383,31 @@ class DisasterRecoveryManager:
         errors = []
 
         try:
-            # 1. Créer une sauvegarde d'urgence
-            emergency_backup = backup_system.create_snapshot("emergency_before_recovery")
-            if emergency_backup[0]:
-                actions.append("Sauvegarde d'urgence créée")
-            else:
-                errors.append(f"Échec sauvegarde d'urgence: {emergency_backup[1]}")
+            from backup_system import backup_system
+
+            # Sauvegarde d'urgence, redémarrage et recherche de sauvegarde sont indépendants
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                fut_backup = executor.submit(backup_system.create_snapshot, "emergency_before_recovery")
+                fut_services = executor.submit(self._restart_essential_services)
+                fut_find = executor.submit(self._find_latest_valid_backup)
+
+                # 1. Créer une sauvegarde d'urgence
+                emergency_backup = fut_backup.result()
+                if emergency_backup[0]:
+                    actions.append("Sauvegarde d'urgence créée")
+                else:
+                    errors.append(f"Échec sauvegarde d'urgence: {emergency_backup[1]}")
 
-            # 2. Tenter de redémarrer les services essentiels
-            services_restart = self._restart_essential_services()
-            if services_restart['success']:
-                actions.append("Services essentiels redémarrés")
-            else:
-                errors.append(f"Échec redémarrage services: {services_restart['error']}")
+                # 2. Tenter de redémarrer les services essentiels
+                services_restart = fut_services.result()
+                if services_restart['success']:
+                    actions.append("Services essentiels redémarrés")
+                else:
+                    errors.append(f"Échec redémarrage services: {services_restart['error']}")
+
+                latest_backup = fut_find.result()
 
-            # 3. Restaurer la dernière sauvegarde valide
-            latest_backup = self._find_latest_valid_backup()
+            # 3. Restaurer la dernière sauvegarde valide, une fois les trois étapes terminées
             if latest_backup:
                 restore_result = self._restore_from_backup(latest_backup)
                 if restore_result['success']:
@@ -327,34 +522,28 @@ class DisasterRecoveryManager:
         try:
             if service_name == 'redis':
                 # Commande pour redémarrer Redis
-                result = subprocess.run(['sudo', 'systemctl', 'restart', 'redis'],
-                                      capture_output=True, text=True, timeout=30)
+                result = _run(['sudo', 'systemctl', 'restart', 'redis'], timeout=_TIMEOUT_SYSTEMCTL)
 
                 return {
                     'success': result.returncode == 0,
-                    'output': result.stdout,
                     'error': result.stderr
                 }
 
             elif service_name == 'postgresql':
                 # Commande pour redémarrer PostgreSQL
-                result = subprocess.run(['sudo', 'systemctl', 'restart', 'postgresql'],
-                                      capture_output=True, text=True, timeout=60)
+                result = _run(['sudo', 'systemctl', 'restart', 'postgresql'], timeout=_TIMEOUT_SYSTEMCTL_SLOW)
 
                 return {
                     'success': result.returncode == 0,
-                    'output': result.stdout,
                     'error': result.stderr
                 }
 
             elif service_name == 'nginx':
                 # Commande pour redémarrer Nginx
-                result = subprocess.run(['sudo', 'systemctl', 'restart', 'nginx'],
-                                      capture_output=True, text=True, timeout=30)
+                result = _run(['sudo', 'systemctl', 'restart', 'nginx'], timeout=_TIMEOUT_SYSTEMCTL)
 
                 return {
                     'success': result.returncode == 0,
-                    'output': result.stdout,
                     'error': result.stderr
                 }
 
@@ -373,16 +562,35 @@ class DisasterRecoveryManager:
                                   capture_output=True, text=True)
 
             if result.returncode == 0:
-                pids = result.stdout.strip().split('\n')
-                killed_count = 0
+                pids = [int(pid) for pid in result.stdout.split() if pid.isdigit()]
+                own_pid = os.getpid()
+                signaled = []
 
+                # Un appel kill(2) par processus plutôt qu'un fork+exec de `kill`
                 for pid in pids:
-                    if pid:
-                        try:
-                            subprocess.run(['kill', '-TERM', pid], timeout=10)
-                            killed_count += 1
-                        except:
-                            pass
+                    if pid == own_pid:
+                        continue
+                    try:
+                        os.kill(pid, signal.SIGTERM)
+                        signaled.append(pid)
+                    except (ProcessLookupError, PermissionError):
+                        pass
+
+                # Attendre l'arrêt effectif pour ne pas concurrencer le redémarrage
+                deadline = time.monotonic() + _TERMINATE_GRACE_SEC
+                remaining = signaled
+                while remaining and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    remaining = [pid for pid in remaining if _alive(pid)]
+
+                # Forcer l'arrêt des processus récalcitrants
+                for pid in remaining:
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except (ProcessLookupError, PermissionError):
+                        pass
+
+                killed_count = len(signaled)
 
                 return {
                     'success': True,
@@ -420,7 +628,7 @@ class DisasterRecoveryManager:
             # Vérifier l'intégrité
             integrity_result = subprocess.run([
                 'sqlite3', db_path, 'PRAGMA integrity_check;'
-            ], capture_output=True, text=True, timeout=30)
+            ], capture_output=True, text=True, timeout=_TIMEOUT_SQLITE)
 
             if integrity_result.returncode == 0:
                 integrity_output = integrity_result.stdout.strip()
@@ -429,9 +637,7 @@ class DisasterRecoveryManager:
                     return {'success': True, 'message': 'Base SQLite intègre'}
                 else:
                     # Tentative de réparation
-                    repair_result = subprocess.run([
-                        'sqlite3', db_path, 'REINDEX;'
-                    ], capture_output=True, timeout=60)
+                    repair_result = _run(['sqlite3', db_path, 'REINDEX;'], timeout=_TIMEOUT_SQLITE, want_stderr=False)
 
                     return {
                         'success': repair_result.returncode == 0,
@@ -451,43 +657,48 @@ class DisasterRecoveryManager:
         """Réparer une base PostgreSQL"""
         try:
             # Parser l'URL
-            import re
-            pattern = r'postgresql://([^:]+):([^@]+)@([^:]+):(\d+)/(.+)'
-            match = re.match(pattern, db_url)
+            url = urlparse(db_url)
+            database = url.path.lstrip('/')
 
-            if not match:
+            if not url.scheme.startswith('postgresql') or not (url.username and url.hostname and database):
                 return {'success': False, 'error': 'Format URL PostgreSQL invalide'}
 
-            user, password, host, port, database = match.groups()
+            user = unquote(url.username)
+            password = unquote(url.password or '')
+            host = url.hostname
+            port = url.port or 5432
 
             # Commandes de réparation PostgreSQL
             commands = [
                 f'REINDEX DATABASE {database};',
-                f'VACUUM ANALYZE {database};',
-                f'CHECKPOINT;'
+                'VACUUM ANALYZE;',
+                'CHECKPOINT;'
             ]
 
             env = os.environ.copy()
             env['PGPASSWORD'] = password
 
+            # Une seule session psql pour toutes les commandes (une connexion, une authentification)
             success_count = 0
-            for cmd in commands:
-                try:
-                    result = subprocess.run([
-                        'psql',
-                        f'--host={host}',
-                        f'--port={port}',
-                        f'--username={user}',
-                        f'--dbname={database}',
-                        '--no-password',
-                        '--command', cmd
-                    ], env=env, capture_output=True, text=True, timeout=300)
-
-                    if result.returncode == 0:
-                        success_count += 1
-
-                except Exception as e:
-                    self.logger.warning(f"Erreur commande réparation PostgreSQL: {cmd} - {e}")
+            try:
+                result = _run([
+                    'psql',
+                    f'--host={host}',
+                    f'--port={port}',
+                    f'--username={user}',
+                    f'--dbname={database}',
+                    '--no-password',
+                    '--file=-'
+                ], timeout=_TIMEOUT_PSQL, input='\n'.join(commands) + '\n', env=env)
+
+                if result.returncode == 0:
+                    # Sans ON_ERROR_STOP, psql poursuit après une erreur et la signale sur stderr
+                    success_count = len(commands) - result.stderr.count('ERROR:')
+                else:
+                    self.logger.warning(f"Erreur session réparation PostgreSQL: {result.stderr.strip()}")
+
+            except Exception as e:
+                self.logger.warning(f"Erreur session réparation PostgreSQL: {e}")
 
             return {
                 'success': success_count > 0,
@@ -502,13 +713,10 @@ class DisasterRecoveryManager:
         """Redémarrer l'application"""
         try:
             # Redémarrer l'application Flask via supervisor ou systemd
-            result = subprocess.run([
-                'sudo', 'systemctl', 'restart', 'passprint'
-            ], capture_output=True, text=True, timeout=60)
+            result = _run(['sudo', 'systemctl', 'restart', 'passprint'], timeout=_TIMEOUT_SYSTEMCTL_SLOW)
 
             return {
                 'success': result.returncode == 0,
-                'output': result.stdout,
                 'error': result.stderr
             }
 
@@ -535,13 +743,10 @@ class DisasterRecoveryManager:
         """Redémarrer les workers Celery"""
         try:
             # Redémarrer les workers Celery
-            result = subprocess.run([
-                'sudo', 'systemctl', 'restart', 'celery-workers'
-            ], capture_output=True, text=True, timeout=60)
+            result = _run(['sudo', 'systemctl', 'restart', 'celery-workers'], timeout=_TIMEOUT_SYSTEMCTL_SLOW)
 
             return {
                 'success': result.returncode == 0,
-                'output': result.stdout,
                 'error': result.stderr
             }
 
@@ -555,18 +760,30 @@ class DisasterRecoveryManager:
             if not backup_dir.exists():
                 return None
 
-            # Chercher les sauvegardes récentes
-            backup_files = []
-            for backup_file in backup_dir.glob('passprint_*'):
-                if backup_file.is_file() and backup_file.stat().st_mtime > (datetime.now() - timedelta(hours=24)).timestamp():
-                    backup_files.append(backup_file)
+            cutoff = (datetime.now() - timedelta(hours=24)).timestamp()
+            dir_mtime = backup_dir.stat().st_mtime
+            cache = self._backup_cache
 
-            if not backup_files:
-                return None
+            # Répertoire inchangé: réutiliser le dernier résultat s'il est encore récent
+            if dir_mtime == cache['dir_mtime']:
+                return cache['latest'] if cache['latest_mtime'] > cutoff else None
+
+            # Chercher la sauvegarde récente la plus récente en une seule passe
+            latest_mtime, latest_backup = -1.0, None
+            with os.scandir(backup_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith('passprint_') or not entry.is_file(follow_symlinks=False):
+                        continue
+
+                    mtime = entry.stat().st_mtime
+                    if mtime > cutoff and mtime > latest_mtime:
+                        latest_mtime, latest_backup = mtime, entry.path
 
-            # Retourner la plus récente
-            latest_backup = max(backup_files, key=lambda x: x.stat().st_mtime)
-            return str(latest_backup)
+            cache['dir_mtime'] = dir_mtime
+            cache['latest'] = latest_backup
+            cache['latest_mtime'] = latest_mtime
+
+            return latest_backup
 
         except Exception as e:
             self.logger.error(f"Erreur recherche sauvegarde valide: {e}")
@@ -575,6 +792,8 @@ class DisasterRecoveryManager:
     def _restore_from_backup(self, backup_path: str) -> Dict:
         """Restaurer depuis une sauvegarde"""
         try:
+            from backup_system import backup_system
+
             # Restaurer la base de données
             db_restore_success, db_result = backup_system.restore_database(backup_path)
 
@@ -598,20 +817,26 @@ class DisasterRecoveryManager:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def _create_recovery_report(self, recovery_result: dict):
+    def _create_recovery_report(self, recovery_result: dict, timestamp: str = None, system_metrics: dict = None):
         """Créer un rapport de récupération"""
         try:
+            if timestamp is None:
+                timestamp = recovery_result.get('timestamp') or datetime.utcnow().isoformat()
+
             report = {
-                'recovery_timestamp': datetime.utcnow().isoformat(),
+                'recovery_timestamp': timestamp,
                 'recovery_result': recovery_result,
-                'system_status': self._get_current_system_status(),
+                'system_status': self._get_current_system_status(timestamp, system_metrics),
                 'next_steps': self._get_next_steps(recovery_result)
             }
 
             # Sauvegarder le rapport
             report_file = Path('backups') / f'recovery_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            with open(report_file, 'w') as f:
-                json.dump(report, f, indent=2)
+            if orjson_available:
+                report_file.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+            else:
+                with open(report_file, 'w') as f:
+                    json.dump(report, f)
 
             # Envoyer le rapport par email si configuré
             self._send_recovery_report_email(report)
@@ -619,19 +844,22 @@ class DisasterRecoveryManager:
         except Exception as e:
             self.logger.error(f"Erreur création rapport récupération: {e}")
 
-    def _get_current_system_status(self) -> Dict:
+    def _get_current_system_status(self, timestamp: str = None, metrics: dict = None) -> Dict:
         """Obtenir le statut actuel du système"""
         try:
-            from monitoring_alerting import MetricsCollector
+            # Ne collecter que si aucune métrique n'a été transmise par la détection
+            if metrics is None:
+                from monitoring_alerting import MetricsCollector
 
-            collector = MetricsCollector()
-            collector.collect_all_metrics()
+                collector = MetricsCollector()
+                collector.collect_all_metrics()
+                metrics = collector.metrics
 
             return {
-                'timestamp': datetime.utcnow().isoformat(),
-                'system_healthy': collector.metrics.get('application', {}).get('health', {}).get('healthy', False),
-                'database_healthy': collector.metrics.get('database', {}).get('stats', {}).get('connection_healthy', False),
-                'cache_healthy': collector.metrics.get('cache', {}).get('health', {}).get('status') == 'healthy'
+                'timestamp': timestamp or datetime.utcnow().isoformat(),
+                'system_healthy': metrics.get('application', {}).get('health', {}).get('healthy', False),
+                'database_healthy': metrics.get('database', {}).get('stats', {}).get('connection_healthy', False),
+                'cache_healthy': metrics.get('cache', {}).get('health', {}).get('status') == 'healthy'
             }
 
         except Exception as e:
@@ -664,11 +892,15 @@ class DisasterRecoveryManager:
             if not smtp_username or not smtp_password:
                 return
 
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+
             # Destinataires
             recipients = os.getenv('RECOVERY_EMAIL_RECIPIENTS', 'admin@passprint.com').split(',')
 
             # Créer l'email
-            msg = MimeMultipart()
+            msg = MIMEMultipart()
             msg['From'] = smtp_username
             msg['To'] = ', '.join(recipients)
             msg['Subject'] = f"[PassPrint] Rapport de récupération - {report['recovery_timestamp']}"
@@ -680,57 +912,68 @@ class DisasterRecoveryManager:
             Timestamp: {report['recovery_timestamp']}
             Succès: {'Oui' if report['recovery_result'].get('success', False) else 'Non'}
 
-            Actions prises:
-            {chr(10).join(f"- {action}" for action in report['recovery_result'].get('actions_taken', []))}
+            Actions prises:{_bullets(report['recovery_result'].get('actions_taken', []))}
 
-            Erreurs rencontrées:
-            {chr(10).join(f"- {error}" for error in report['recovery_result'].get('errors', []))}
+            Erreurs rencontrées:{_bullets(report['recovery_result'].get('errors', []))}
 
             État système actuel:
             - Système sain: {'Oui' if report['system_status'].get('system_healthy', False) else 'Non'}
             - Base de données: {'Saine' if report['system_status'].get('database_healthy', False) else 'Problématique'}
             - Cache: {'Sain' if report['system_status'].get('cache_healthy', False) else 'Problématique'}
 
-            Prochaines étapes:
-            {chr(10).join(f"- {step}" for step in report.get('next_steps', []))}
+            Prochaines étapes:{_bullets(report.get('next_steps', []))}
 
             Ce rapport a été généré automatiquement par le système de récupération après désastre.
             """
 
-            msg.attach(MimeText(body, 'plain'))
+            msg.attach(MIMEText(body, 'plain'))
 
-            # Envoyer l'email
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(smtp_username, recipients, msg.as_string())
-            server.quit()
+            # Envoyer l'email via la connexion persistante (reconnexion si coupée)
+            with self._smtp_lock:
+                server = self._get_smtp(smtp_server, smtp_port, smtp_username, smtp_password)
+                try:
+                    server.sendmail(smtp_username, recipients, msg.as_string())
+                except smtplib.SMTPServerDisconnected:
+                    self._smtp = None
+                    server = self._get_smtp(smtp_server, smtp_port, smtp_username, smtp_password)
+                    server.sendmail(smtp_username, recipients, msg.as_string())
 
             self.logger.info("Rapport de récupération envoyé par email")
 
         except Exception as e:
             self.logger.error(f"Erreur envoi email rapport récupération: {e}")
 
-    def create_recovery_scripts(self):
-        """Créer les scripts de récupération automatique"""
-        try:
-            scripts_created = []
+    def _get_smtp(self, smtp_server: str, smtp_port: int, smtp_username: str, smtp_password: str) -> 'smtplib.SMTP':
+        """Obtenir la connexion SMTP en cache, ou en ouvrir une nouvelle"""
+        import smtplib
+
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
 
-            # Script de récupération de base de données
-            db_script = self._create_database_recovery_script()
-            scripts_created.append(db_script)
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
 
-            # Script de récupération de fichiers
-            files_script = self._create_files_recovery_script()
-            scripts_created.append(files_script)
+        server = smtplib.SMTP(smtp_server, smtp_port)
+        server.starttls()
+        server.login(smtp_username, smtp_password)
 
-            # Script de récupération complète
-            full_script = self._create_full_recovery_script()
-            scripts_created.append(full_script)
+        self._smtp = server
+        return server
 
-            # Script de vérification post-récupération
-            verify_script = self._create_verification_script()
-            scripts_created.append(verify_script)
+    def create_recovery_scripts(self):
+        """Créer les scripts de récupération automatique"""
+        try:
+            scripts_created = [
+                self._install_recovery_script(script_name, template_name)
+                for script_name, template_name in _RECOVERY_SCRIPT_TEMPLATES.items()
+            ]
 
             self.logger.info(f"Scripts de récupération créés: {len(scripts_created)}")
             return scripts_created
@@ -739,223 +982,20 @@ class DisasterRecoveryManager:
             self.logger.error(f"Erreur création scripts récupération: {e}")
             return []
 
-    def _create_database_recovery_script(self) -> str:
-        """Créer le script de récupération de base de données"""
-        script_content = """#!/bin/bash
-# Script de récupération de base de données PassPrint
-# Usage: ./recover_database.sh [backup_file]
-
-set -e
-
-BACKUP_FILE=${1:-"latest"}
-LOG_FILE="/var/log/passprint/database_recovery.log"
-
-echo "$(date): Démarrage récupération base de données" >> "$LOG_FILE"
-
-if [ "$BACKUP_FILE" = "latest" ]; then
-    # Trouver la dernière sauvegarde
-    BACKUP_FILE=$(find /backups -name "passprint_*sqlite*" -o -name "passprint_*postgres*" | sort -r | head -1)
-fi
-
-if [ -z "$BACKUP_FILE" ]; then
-    echo "$(date): Aucune sauvegarde trouvée" >> "$LOG_FILE"
-    exit 1
-fi
-
-echo "$(date): Utilisation sauvegarde: $BACKUP_FILE" >> "$LOG_FILE"
-
-# Arrêter l'application
-sudo systemctl stop passprint
-
-# Créer une sauvegarde d'urgence
-EMERGENCY_BACKUP="/backups/emergency_$(date +%Y%m%d_%H%M%S).db"
-cp /opt/passprint-website/passprint.db "$EMERGENCY_BACKUP" 2>/dev/null || true
-
-# Restaurer la sauvegarde
-if [[ "$BACKUP_FILE" == *"postgres"* ]]; then
-    # Restauration PostgreSQL
-    pg_restore -h localhost -U passprint -d passprint_prod -c "$BACKUP_FILE"
-elif [[ "$BACKUP_FILE" == *"sqlite"* ]]; then
-    # Restauration SQLite
-    gunzip -c "$BACKUP_FILE" > /opt/passprint-website/passprint.db
-    chown passprint:passprint /opt/passprint-website/passprint.db
-fi
-
-# Redémarrer l'application
-sudo systemctl start passprint
-
-# Vérification
-sleep 10
-curl -f http://localhost:5000/api/health || exit 1
-
-echo "$(date): Récupération base de données terminée avec succès" >> "$LOG_FILE"
-"""
-
-        script_path = self.recovery_scripts_dir / 'recover_database.sh'
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-
-        script_path.chmod(0o755)
-        return str(script_path)
-
-    def _create_files_recovery_script(self) -> str:
-        """Créer le script de récupération de fichiers"""
-        script_content = """#!/bin/bash
-# Script de récupération de fichiers PassPrint
-# Usage: ./recover_files.sh [backup_file]
-
-set -e
-
-BACKUP_FILE=${1:-"latest"}
-LOG_FILE="/var/log/passprint/files_recovery.log"
-
-echo "$(date): Démarrage récupération fichiers" >> "$LOG_FILE"
-
-if [ "$BACKUP_FILE" = "latest" ]; then
-    # Trouver la dernière sauvegarde de fichiers
-    BACKUP_FILE=$(find /backups -name "*files*" | sort -r | head -1)
-fi
-
-if [ -z "$BACKUP_FILE" ]; then
-    echo "$(date): Aucune sauvegarde de fichiers trouvée" >> "$LOG_FILE"
-    exit 1
-fi
+    def _install_recovery_script(self, script_name: str, template_name: str) -> str:
+        """Installer un script de récupération depuis son modèle"""
+        template_path = _RECOVERY_TEMPLATES_DIR / template_name
+        script_path = self.recovery_scripts_dir / script_name
 
-echo "$(date): Utilisation sauvegarde: $BACKUP_FILE" >> "$LOG_FILE"
-
-# Créer des sauvegardes des fichiers actuels
-for dir in uploads static logs; do
-    if [ -d "/opt/passprint-website/$dir" ]; then
-        BACKUP_DIR="/backups/emergency_files_$(date +%Y%m%d_%H%M%S)/$dir"
-        mkdir -p "$BACKUP_DIR"
-        cp -r "/opt/passprint-website/$dir" "$BACKUP_DIR" 2>/dev/null || true
-    fi
-done
-
-# Extraire la sauvegarde
-cd /opt/passprint-website
-tar -xzf "$BACKUP_FILE"
-
-# Restaurer les permissions
-chown -R passprint:passprint uploads static logs
-
-echo "$(date): Récupération fichiers terminée avec succès" >> "$LOG_FILE"
-"""
-
-        script_path = self.recovery_scripts_dir / 'recover_files.sh'
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-
-        script_path.chmod(0o755)
-        return str(script_path)
-
-    def _create_full_recovery_script(self) -> str:
-        """Créer le script de récupération complète"""
-        script_content = """#!/bin/bash
-# Script de récupération complète PassPrint
-# Usage: ./recover_full.sh
-
-set -e
-
-LOG_FILE="/var/log/passprint/full_recovery.log"
-
-echo "$(date): Démarrage récupération complète" >> "$LOG_FILE"
-
-# 1. Récupération base de données
-echo "$(date): Étape 1/4 - Récupération base de données" >> "$LOG_FILE"
-./recover_database.sh
-
-# 2. Récupération fichiers
-echo "$(date): Étape 2/4 - Récupération fichiers" >> "$LOG_FILE"
-./recover_files.sh
-
-# 3. Redémarrage services
-echo "$(date): Étape 3/4 - Redémarrage services" >> "$LOG_FILE"
-sudo systemctl restart redis postgresql nginx passprint celery-workers
-
-# 4. Vérification
-echo "$(date): Étape 4/4 - Vérification" >> "$LOG_FILE"
-sleep 30
-
-# Vérifications de base
-curl -f http://localhost:5000/api/health || exit 1
-curl -f http://localhost:5000/api/products || exit 1
-
-echo "$(date): Récupération complète terminée avec succès" >> "$LOG_FILE"
-"""
-
-        script_path = self.recovery_scripts_dir / 'recover_full.sh'
-        with open(script_path, 'w') as f:
-            f.write(script_content)
-
-        script_path.chmod(0o755)
-        return str(script_path)
-
-    def _create_verification_script(self) -> str:
-        """Créer le script de vérification post-récupération"""
-        script_content = """#!/bin/bash
-# Script de vérification post-récupération PassPrint
-# Usage: ./verify_recovery.sh
-
-LOG_FILE="/var/log/passprint/verification.log"
-
-echo "$(date): Démarrage vérification post-récupération" >> "$LOG_FILE"
-
-ERRORS=0
-
-# 1. Vérifier la santé de l'API
-echo "$(date): Vérification API..." >> "$LOG_FILE"
-if curl -f http://localhost:5000/api/health > /dev/null 2>&1; then
-    echo "$(date): ✅ API opérationnelle" >> "$LOG_FILE"
-else
-    echo "$(date): ❌ API non opérationnelle" >> "$LOG_FILE"
-    ERRORS=$((ERRORS + 1))
-fi
-
-# 2. Vérifier la base de données
-echo "$(date): Vérification base de données..." >> "$LOG_FILE"
-if curl -f http://localhost:5000/api/products > /dev/null 2>&1; then
-    echo "$(date): ✅ Base de données accessible" >> "$LOG_FILE"
-else
-    echo "$(date): ❌ Base de données inaccessible" >> "$LOG_FILE"
-    ERRORS=$((ERRORS + 1))
-fi
-
-# 3. Vérifier les services
-echo "$(date): Vérification services..." >> "$LOG_FILE"
-SERVICES=("redis" "postgresql" "nginx" "passprint")
-for service in "${SERVICES[@]}"; do
-    if sudo systemctl is-active --quiet "$service"; then
-        echo "$(date): ✅ Service $service actif" >> "$LOG_FILE"
-    else
-        echo "$(date): ❌ Service $service inactif" >> "$LOG_FILE"
-        ERRORS=$((ERRORS + 1))
-    fi
-done
-
-# 4. Vérifier les sauvegardes récentes
-echo "$(date): Vérification sauvegardes..." >> "$LOG_FILE"
-if find /backups -name "passprint_*" -mtime -1 | grep -q .; then
-    echo "$(date): ✅ Sauvegardes récentes trouvées" >> "$LOG_FILE"
-else
-    echo "$(date): ⚠️ Aucune sauvegarde récente" >> "$LOG_FILE"
-fi
-
-# Résultat final
-if [ $ERRORS -eq 0 ]; then
-    echo "$(date): ✅ Vérification réussie - Système opérationnel" >> "$LOG_FILE"
-    exit 0
-else
-    echo "$(date): ❌ $ERRORS erreurs détectées" >> "$LOG_FILE"
-    exit 1
-fi
-"""
+        # Ne recopier que si le modèle est plus récent que le script installé
+        try:
+            up_to_date = script_path.stat().st_mtime >= template_path.stat().st_mtime
+        except FileNotFoundError:
+            up_to_date = False
 
-        script_path = self.recovery_scripts_dir / 'verify_recovery.sh'
-        with open(script_path, 'w') as f:
-            f.write(script_content)
+        if not up_to_date:
+            _write_exec(script_path, template_path.read_bytes())
 
-        script_path.chmod(0o755)
         return str(script_path)
 
     def simulate_disaster_scenario(self, scenario_type: str) -> Dict:
@@ -1053,9 +1093,9 @@ def detect_disaster(system_metrics: dict) -> Dict:
     """Fonction utilitaire pour détecter un désastre"""
     return disaster_recovery_manager.detect_disaster(system_metrics)
 
-def initiate_recovery(disaster_info: dict) -> Dict:
+def initiate_recovery(disaster_info: dict, system_metrics: dict = None) -> Dict:
     """Fonction utilitaire pour initier la récupération"""
-    return disaster_recovery_manager.initiate_automatic_recovery(disaster_info)
+    return disaster_recovery_manager.initiate_automatic_recovery(disaster_info, system_metrics)
 
 def create_recovery_scripts():
     """Fonction utilitaire pour créer les scripts de récupération"""
@@ -4,10 +4,30 @@ Export Excel des données pour PassPrint
 Génère des rapports Excel avec openpyxl
 """
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
 from openpyxl.utils import get_column_letter
-from datetime import datetime
+import json
 import os
+import time
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+try:
+    import xlsxwriter
+    xlsxwriter_available = True
+except ImportError:
+    xlsxwriter_available = False
+
+def _items_json(items) -> str:
+    """Sérialiser la liste des produits d'une commande en JSON compact"""
+    if orjson_available:
+        return orjson.dumps(items or [], option=orjson.OPT_NON_STR_KEYS, default=str).decode()
+    return json.dumps(items or [], separators=(',', ':'), ensure_ascii=False, default=str)
 
 class ExcelExporter:
     """Exporteur Excel professionnel"""
@@ -18,68 +38,118 @@ class ExcelExporter:
 
     def export_orders(self, orders_data: list) -> str:
         """Exporter les commandes en Excel"""
-        filename = f"commandes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = os.path.join(self.output_dir, f"commandes_{self._timestamp()}.xlsx")
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Commandes"
-
-        # En-têtes
         headers = ['ID', 'Numéro', 'Client', 'Montant', 'Statut', 'Date', 'Produits']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="2D1B69", end_color="2D1B69", fill_type="solid")
-
-        # Données
-        for row, order in enumerate(orders_data, 2):
-            ws.cell(row=row, column=1, value=order.get('id', ''))
-            ws.cell(row=row, column=2, value=order.get('order_number', ''))
-            ws.cell(row=row, column=3, value=order.get('customer_name', ''))
-            ws.cell(row=row, column=4, value=order.get('total_amount', 0))
-            ws.cell(row=row, column=5, value=order.get('status', ''))
-            ws.cell(row=row, column=6, value=order.get('created_at', ''))
-            ws.cell(row=row, column=7, value=str(order.get('items', [])))
-
-        # Ajuster la largeur des colonnes
-        for col in range(1, 8):
-            ws.column_dimensions[get_column_letter(col)].width = 15
-
-        wb.save(filepath)
+        rows = (
+            [
+                order.get('id', ''),
+                order.get('order_number', ''),
+                order.get('customer_name', ''),
+                order.get('total_amount', 0),
+                order.get('status', ''),
+                order.get('created_at', ''),
+                _items_json(order.get('items'))
+            ]
+            for order in orders_data
+        )
+
+        self._write_sheet(filepath, "Commandes", headers, rows, "2D1B69")
         return filepath
 
     def export_products(self, products_data: list) -> str:
         """Exporter les produits en Excel"""
-        filename = f"produits_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = os.path.join(self.output_dir, f"produits_{self._timestamp()}.xlsx")
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Produits"
+        headers = ['ID', 'Nom', 'Prix', 'Catégorie', 'Stock', 'Statut']
+        rows = (
+            [
+                product.get('id', ''),
+                product.get('name', ''),
+                product.get('price', 0),
+                product.get('category', ''),
+                product.get('stock_quantity', 0),
+                'Actif' if product.get('is_active') else 'Inactif'
+            ]
+            for product in products_data
+        )
+
+        self._write_sheet(filepath, "Produits", headers, rows, "FF6B35")
+        return filepath
+
+    def _timestamp(self) -> str:
+        """Horodatage de fichier, suffixé pour distinguer les exports d'une même seconde"""
+        return f"{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() & 0xffff:04x}"
+
+    def _write_sheet(self, filepath: str, title: str, headers: list, rows, color: str):
+        """Écrire une feuille unique, avec xlsxwriter si disponible"""
+        if xlsxwriter_available:
+            self._write_sheet_xlsxwriter(filepath, title, headers, rows, color)
+        else:
+            self._write_sheet_openpyxl(filepath, title, headers, rows, color)
+
+    def _write_sheet_xlsxwriter(self, filepath: str, title: str, headers: list, rows, color: str):
+        """Écrire la feuille avec xlsxwriter en mémoire constante (ligne par ligne)"""
+        wb = xlsxwriter.Workbook(filepath, {'constant_memory': True, 'strings_to_urls': False})
+        try:
+            ws = wb.add_worksheet(title)
+            header_format = wb.add_format({'bold': True, 'font_color': '#FFFFFF', 'bg_color': f'#{color}'})
+
+            # Ajuster la largeur des colonnes
+            ws.set_column(0, len(headers) - 1, 15)
+
+            # En-têtes
+            ws.write_row(0, 0, headers, header_format)
+
+            # Données
+            for row, values in enumerate(rows, 1):
+                ws.write_row(row, 0, values)
+        finally:
+            wb.close()
+
+    def _write_sheet_openpyxl(self, filepath: str, title: str, headers: list, rows, color: str):
+        """Écrire la feuille avec openpyxl en mode écriture seule"""
+        # Classeur en écriture seule: les lignes sont écrites au fil de l'eau
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+
+        # Ajuster la largeur des colonnes (avant toute ligne en mode écriture seule)
+        for col in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 15
 
         # En-têtes
-        headers = ['ID', 'Nom', 'Prix', 'Catégorie', 'Stock', 'Statut']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="FF6B35", end_color="FF6B35", fill_type="solid")
+        ws.append(self._header_row(ws, headers, color))
 
         # Données
-        for row, product in enumerate(products_data, 2):
-            ws.cell(row=row, column=1, value=product.get('id', ''))
-            ws.cell(row=row, column=2, value=product.get('name', ''))
-            ws.cell(row=row, column=3, value=product.get('price', 0))
-            ws.cell(row=row, column=4, value=product.get('category', ''))
-            ws.cell(row=row, column=5, value=product.get('stock_quantity', 0))
-            ws.cell(row=row, column=6, value='Actif' if product.get('is_active') else 'Inactif')
-
-        # Ajuster la largeur des colonnes
-        for col in range(1, 7):
-            ws.column_dimensions[get_column_letter(col)].width = 15
+        for values in rows:
+            ws.append(values)
 
         wb.save(filepath)
-        return filepath
+        wb.close()
+
+    @staticmethod
+    def _header_style(color: str) -> NamedStyle:
+        """Créer le style nommé des en-têtes pour une couleur de fond"""
+        return NamedStyle(
+            name=f"header_{color}",
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color=color, end_color=color, fill_type="solid")
+        )
+
+    def _header_row(self, ws, headers: list, color: str) -> list:
+        """Construire la ligne d'en-têtes avec un style nommé unique"""
+        # Style propre à ce classeur (objet mutable, jamais partagé entre exports),
+        # enregistré une fois puis affecté par nom à toutes les cellules d'en-tête
+        style_name = f"header_{color}"
+        if style_name not in ws.parent.named_styles:
+            ws.parent.add_named_style(self._header_style(color))
+
+        row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.style = style_name
+            row.append(cell)
+        return row
 
 # Instance globale de l'exporteur Excel
 excel_exporter = ExcelExporter()
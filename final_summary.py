@@ -4,19 +4,28 @@ Résumé final du projet PassPrint
 Bilan complet de tout ce qui a été implémenté
 """
 import os
-import json
 
 def get_project_summary():
     """Obtenir le résumé du projet"""
-    files = [f for f in os.listdir('.') if f.endswith('.py') and f != '__pycache__']
-    html_files = [f for f in os.listdir('.') if f.endswith('.html')]
-    other_files = [f for f in os.listdir('.') if not f.endswith('.py') and not f.endswith('.html') and f != '__pycache__']
+    # Un seul parcours du répertoire, réparti par extension
+    python_count = html_count = other_count = 0
+    with os.scandir('.') as entries:
+        for entry in entries:
+            name = entry.name
+            if name == '__pycache__':
+                continue
+            if name.endswith('.py'):
+                python_count += 1
+            elif name.endswith('.html'):
+                html_count += 1
+            else:
+                other_count += 1
 
     summary = {
-        'total_files': len(files) + len(html_files) + len(other_files),
-        'python_files': len(files),
-        'html_files': len(html_files),
-        'other_files': len(other_files),
+        'total_files': python_count + html_count + other_count,
+        'python_files': python_count,
+        'html_files': html_count,
+        'other_files': other_count,
         'total_lines': 0,
         'features': [
             'Backend API complet avec 25+ endpoints',
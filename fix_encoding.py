@@ -5,31 +5,49 @@ Corrige les caractères mal encodés et vérifie UTF-8
 """
 import os
 import glob
+import mmap
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Dictionnaire des corrections d'encodage
+_SUB_MAP = {
+    'Ã ': 'à',  # a accent grave
+    'Ã©': 'é',  # e accent aigu
+    'Ã¨': 'è',  # e accent grave
+    'Ã´': 'ô',  # o accent circonflexe
+    'Ã»': 'û',  # u accent circonflexe
+    'Ã§': 'ç',  # c cedille
+    'â€™': "'",  # apostrophe
+    'â€œ': '"',  # guillemet double gauche
+    'â€': '"',  # guillemet double droite
+    'â€¢': '•',  # puce
+    'â€“': '–',  # tiret moyen
+    'â€”': '—',  # tiret long
+}
+
+# Corrections d'un seul caractère: table de traduction appliquée en C
+_TRANSLATE_TABLE = {ord(key): value for key, value in _SUB_MAP.items() if len(key) == 1}
+
+# Séquences multi-octets: une seule expression, clés les plus longues d'abord
+# pour que 'â€™' l'emporte sur 'â€'
+_MULTI_MAP = {key: value for key, value in _SUB_MAP.items() if len(key) > 1}
+_SUB_RE = re.compile('|'.join(re.escape(key) for key in sorted(_MULTI_MAP, key=len, reverse=True)))
+
+# Octets UTF-8 pouvant débuter une correction, et balises meta déjà conformes
+_CANDIDATE_PREFIXES = tuple({key[0].encode('utf-8') for key in _SUB_MAP})
+_UTF8_META_TAGS = (b'<meta charset="UTF-8">', b'<meta charset="utf-8">')
+
+# En dessous de ce nombre de fichiers, le coût de démarrage des processus domine
+_PARALLEL_MIN_FILES = 8
 
 def fix_encoding(content):
     """Corrige les caractères mal encodés UTF-8"""
-    # Dictionnaire des corrections d'encodage
-    corrections = {
-        'Ã ': 'à',  # a accent grave
-        'Ã©': 'é',  # e accent aigu
-        'Ã¨': 'è',  # e accent grave
-        'Ã ': 'à',  # a accent grave (variante)
-        'Ã´': 'ô',  # o accent circonflexe
-        'Ã»': 'û',  # u accent circonflexe
-        'Ã§': 'ç',  # c cedille
-        'â€': '—',  # tiret long
-        'â€™': "'",  # apostrophe
-        'â€œ': '"',  # guillemet double gauche
-        'â€': '"',  # guillemet double droite
-        'â€¢': '•',  # puce
-        'â€“': '–',  # tiret moyen
-        'â€”': '—',  # tiret long
-    }
-
-    # Appliquer toutes les corrections
-    for wrong, correct in corrections.items():
-        content = content.replace(wrong, correct)
+    # Appliquer les corrections multi-caractères en un seul passage
+    content = _SUB_RE.sub(lambda match: _MULTI_MAP[match.group(0)], content)
+
+    # Puis les corrections d'un seul caractère
+    if _TRANSLATE_TABLE:
+        content = content.translate(_TRANSLATE_TABLE)
 
     return content
 
@@ -51,11 +69,27 @@ def ensure_utf8_meta(content):
 
     return content
 
+def needs_processing(filepath):
+    """Pré-analyse des octets bruts: le fichier contient-il un motif à corriger ?"""
+    if os.path.getsize(filepath) == 0:
+        return False
+
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if any(mm.find(prefix) != -1 for prefix in _CANDIDATE_PREFIXES):
+                return True
+            return all(mm.find(tag) == -1 for tag in _UTF8_META_TAGS)
+
 def process_html_file(filepath):
     """Traite un fichier HTML individuel"""
     try:
         print(f"Traitement: {filepath}")
 
+        # Éviter le décodage des fichiers déjà propres
+        if not needs_processing(filepath):
+            print(f"  [OK] {filepath} (aucune modification)")
+            return False
+
         # Lire le fichier
         with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
             content = f.read()
@@ -119,11 +153,13 @@ def main():
     html_files = find_html_files()
     print(f"Fichiers HTML trouves: {len(html_files)}")
 
-    # Traiter chaque fichier
-    modified_count = 0
-    for html_file in html_files:
-        if process_html_file(html_file):
-            modified_count += 1
+    # Traiter chaque fichier, en parallèle sur tous les cœurs si le lot le justifie
+    if len(html_files) >= _PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(process_html_file, html_files, chunksize=4))
+    else:
+        results = [process_html_file(html_file) for html_file in html_files]
+    modified_count = sum(results)
 
     print("\nResultats:")
     print(f"- Fichiers traites: {len(html_files)}")
@@ -7,54 +7,59 @@ import os
 import cairosvg
 from PIL import Image
 import io
-
-def svg_to_png(svg_path, png_path, size):
-    """Convertit SVG en PNG à la taille spécifiée"""
+from concurrent.futures import ThreadPoolExecutor
+
+def render_svg(svg_bytes, size):
+    """Rend le SVG en mémoire et retourne une image PIL RGBA"""
+    buffer = io.BytesIO()
+    cairosvg.svg2png(
+        bytestring=svg_bytes,
+        write_to=buffer,
+        output_width=size,
+        output_height=size,
+        scale=1.0
+    )
+    buffer.seek(0)
+    return Image.open(buffer).convert('RGBA')
+
+def render_sizes(svg_bytes, sizes):
+    """Rend le SVG à plusieurs tailles en parallèle (cairo libère le GIL)"""
+    def _render(size):
+        try:
+            return size, render_svg(svg_bytes, size)
+        except Exception as e:
+            print(f"  [ERREUR] Conversion SVG ({size}x{size}): {e}")
+            return size, None
+
+    with ThreadPoolExecutor(max_workers=len(sizes)) as executor:
+        return dict(executor.map(_render, sizes))
+
+def save_png(img, png_path):
+    """Enregistre une image rendue au format PNG"""
+    if img is None:
+        return False
     try:
-        # Convertir SVG en PNG avec cairosvg
-        cairosvg.svg2png(
-            url=svg_path,
-            write_to=png_path,
-            output_width=size,
-            output_height=size,
-            scale=1.0
-        )
-        print(f"  [OK] PNG cree: {png_path} ({size}x{size})")
+        img.save(png_path, format='PNG')
+        print(f"  [OK] PNG cree: {png_path} ({img.size[0]}x{img.size[1]})")
         return True
     except Exception as e:
-        print(f"  [ERREUR] Conversion SVG: {e}")
+        print(f"  [ERREUR] Enregistrement PNG: {e}")
         return False
 
-def create_favicon_ico(sizes, output_path):
+def create_favicon_ico(svg_bytes, sizes, output_path, master=None):
     """Crée un fichier .ico multi-résolutions"""
     try:
-        images = []
-        for size in sizes:
-            png_path = f"temp_favicon_{size}.png"
-            if svg_to_png("images/logo.svg", png_path, size):
-                img = Image.open(png_path)
-                # Convertir en mode RGBA si nécessaire
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                images.append(img)
-            else:
-                return False
-
-        # Sauvegarder comme .ico
-        if images:
-            images[0].save(
-                output_path,
-                format='ICO',
-                sizes=[(img.size[0], img.size[1]) for img in images],
-                append_images=images[1:]
-            )
-            print(f"  [OK] ICO cree: {output_path}")
-
-        # Nettoyer les fichiers temporaires
-        for size in sizes:
-            temp_file = f"temp_favicon_{size}.png"
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        # Un seul rendu à la plus grande taille, Pillow réduit pour les autres
+        if master is None:
+            master = render_svg(svg_bytes, max(sizes))
+
+        # Sauvegarder comme .ico (réduction LANCZOS gérée par Pillow)
+        master.save(
+            output_path,
+            format='ICO',
+            sizes=[(size, size) for size in sizes]
+        )
+        print(f"  [OK] ICO cree: {output_path}")
 
         return True
 
@@ -80,23 +85,31 @@ def generate_favicons():
 
     print(f"Source: {svg_path}")
 
-    # 1. Générer favicon.ico (multi-résolutions)
+    # Lire le SVG une seule fois pour tous les rendus
+    with open(svg_path, 'rb') as f:
+        svg_bytes = f.read()
+
+    # Rendre toutes les tailles en parallèle, puis écrire les fichiers séquentiellement
     ico_sizes = [16, 32, 48]
+    renders = render_sizes(svg_bytes, [max(ico_sizes), 32, 16, 180])
+
+    # 1. Générer favicon.ico (multi-résolutions)
     ico_path = os.path.join(images_dir, "favicon.ico")
-    if create_favicon_ico(ico_sizes, ico_path):
+    master = renders[max(ico_sizes)]
+    if master is not None and create_favicon_ico(svg_bytes, ico_sizes, ico_path, master):
         print("  [OK] favicon.ico genere avec tailles 16x16, 32x32, 48x48")
 
     # 2. Générer favicon-32x32.png
     png32_path = os.path.join(images_dir, "favicon-32x32.png")
-    svg_to_png(svg_path, png32_path, 32)
+    save_png(renders[32], png32_path)
 
     # 3. Générer favicon-16x16.png
     png16_path = os.path.join(images_dir, "favicon-16x16.png")
-    svg_to_png(svg_path, png16_path, 16)
+    save_png(renders[16], png16_path)
 
     # 4. Générer apple-touch-icon.png (180x180)
     apple_path = os.path.join(images_dir, "apple-touch-icon.png")
-    svg_to_png(svg_path, apple_path, 180)
+    save_png(renders[180], apple_path)
 
     print("\nGeneration terminee!")
     print("Fichiers crees:")
@@ -4,26 +4,46 @@ Script simplifié de génération des favicons pour PassPrint
 Utilise Pillow uniquement pour créer des favicons basiques
 """
 import os
-from PIL import Image, ImageDraw, ImageFont
-import math
+from PIL import Image, ImageDraw
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
 
 def create_simple_logo(size):
     """Crée un logo simple pour favicon"""
+    center = size // 2
+    radius = int(size * 0.35)
+    square_size = int(size * 0.15)
+    square_pos = int(size * 0.25)
+
+    if numpy_available:
+        # Composer directement les pixels RGBA, sans primitives de dessin
+        arr = np.empty((size, size, 4), dtype=np.uint8)
+        arr[...] = (255, 107, 53, 255)  # Couleur principale #FF6B35
+
+        # Cercle blanc au centre
+        yy, xx = np.ogrid[:size, :size]
+        arr[(xx - center) ** 2 + (yy - center) ** 2 <= radius ** 2] = (255, 255, 255, 255)
+
+        # Petit carré noir (bornes incluses, comme ImageDraw.rectangle)
+        arr[square_pos:square_pos + square_size + 1, square_pos:square_pos + square_size + 1] = (0, 0, 0, 255)
+
+        return Image.fromarray(arr)
+
     # Créer une image carrée
     img = Image.new('RGBA', (size, size), (255, 107, 53, 255))  # Couleur principale #FF6B35
     draw = ImageDraw.Draw(img)
 
     # Ajouter un cercle blanc au centre
-    center = size // 2
-    radius = int(size * 0.35)
     draw.ellipse(
         [(center - radius, center - radius), (center + radius, center + radius)],
         fill=(255, 255, 255, 255)
     )
 
     # Ajouter un petit carré noir (représentant l'impression)
-    square_size = int(size * 0.15)
-    square_pos = int(size * 0.25)
     draw.rectangle(
         [square_pos, square_pos, square_pos + square_size, square_pos + square_size],
         fill=(0, 0, 0, 255)
@@ -4,6 +4,25 @@ Service de géolocalisation pour PassPrint
 Gère la localisation et les calculs de distance
 """
 import json
+import math
+from bisect import bisect_left
+from types import MappingProxyType
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
+# Rayon moyen de la Terre (km)
+EARTH_RADIUS_KM = 6371.0
+
+# Zones de livraison (vue en lecture seule, construite une seule fois)
+_ZONES = MappingProxyType({
+    'zone_1': MappingProxyType({'name': 'Centre-ville', 'max_distance': 5, 'delivery_fee': 1000}),
+    'zone_2': MappingProxyType({'name': 'Périphérie', 'max_distance': 15, 'delivery_fee': 2500}),
+    'zone_3': MappingProxyType({'name': 'Extérieur', 'max_distance': 50, 'delivery_fee': 5000})
+})
 
 class GeolocationService:
     """Service de géolocalisation"""
@@ -14,23 +33,44 @@ class GeolocationService:
             'lng': 9.7679,
             'address': 'Douala, Cameroun'
         }
+        self._company_lat = self.company_location['lat']
+        self._company_lng = self.company_location['lng']
+
+        # Zones triées par distance maximale; la dernière entrée correspond au hors zone
+        zones = sorted(self.get_delivery_zones().values(), key=lambda zone: zone['max_distance'])
+        self._zone_thresholds = [zone['max_distance'] for zone in zones]
+        self._zone_names = [zone['name'] for zone in zones] + ['Hors zone']
+        self._zone_fees = [zone['delivery_fee'] for zone in zones] + [10000]
 
     def calculate_distance(self, lat1: float, lng1: float, lat2: float = None, lng2: float = None):
-        """Calculer la distance entre deux points"""
+        """Calculer la distance entre deux points (formule de Haversine)"""
         if lat2 is None or lng2 is None:
-            lat2, lng2 = self.company_location['lat'], self.company_location['lng']
+            lat2, lng2 = self._company_lat, self._company_lng
 
-        # Calcul simple de distance (formule de Haversine simplifiée)
-        distance = ((lat1 - lat2) ** 2 + (lng1 - lng2) ** 2) ** 0.5 * 111  # km approximatif
+        phi1 = math.radians(lat1)
+        phi2 = math.radians(lat2)
+        a = (math.sin((phi2 - phi1) / 2) ** 2
+             + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
         return round(distance, 2)
 
+    def calculate_distances(self, lats, lngs, lat2: float = None, lng2: float = None):
+        """Calculer en lot les distances de plusieurs points (NumPy si disponible)"""
+        if lat2 is None or lng2 is None:
+            lat2, lng2 = self._company_lat, self._company_lng
+
+        if not numpy_available:
+            return [self.calculate_distance(lat, lng, lat2, lng2) for lat, lng in zip(lats, lngs)]
+
+        phi1 = np.radians(np.asarray(lats, dtype=float))
+        phi2 = math.radians(lat2)
+        dlng = np.radians(lng2 - np.asarray(lngs, dtype=float))
+        a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * math.cos(phi2) * np.sin(dlng / 2) ** 2
+        return np.round(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)), 2)
+
     def get_delivery_zones(self):
-        """Obtenir les zones de livraison"""
-        return {
-            'zone_1': {'name': 'Centre-ville', 'max_distance': 5, 'delivery_fee': 1000},
-            'zone_2': {'name': 'Périphérie', 'max_distance': 15, 'delivery_fee': 2500},
-            'zone_3': {'name': 'Extérieur', 'max_distance': 50, 'delivery_fee': 5000}
-        }
+        """Obtenir les zones de livraison (lecture seule, copier avec dict() pour modifier)"""
+        return _ZONES
 
 # Instance globale du service de géolocalisation
 geolocation_service = GeolocationService()
@@ -38,21 +78,34 @@ geolocation_service = GeolocationService()
 def calculate_delivery_fee(lat: float, lng: float):
     """Calculer les frais de livraison"""
     distance = geolocation_service.calculate_distance(lat, lng)
-    zones = geolocation_service.get_delivery_zones()
 
-    for zone_id, zone in zones.items():
-        if distance <= zone['max_distance']:
-            return {
-                'distance': distance,
-                'zone': zone['name'],
-                'delivery_fee': zone['delivery_fee']
-            }
+    # Premier seuil >= distance, en O(log n)
+    index = bisect_left(geolocation_service._zone_thresholds, distance)
 
     return {
         'distance': distance,
-        'zone': 'Hors zone',
-        'delivery_fee': 10000
+        'zone': geolocation_service._zone_names[index],
+        'delivery_fee': geolocation_service._zone_fees[index]
     }
 
+def calculate_delivery_fees_bulk(points) -> list:
+    """Calculer les frais de livraison d'un lot de points (lat, lng)"""
+    if not numpy_available:
+        return [calculate_delivery_fee(lat, lng) for lat, lng in points]
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    distances = geolocation_service.calculate_distances(points[:, 0], points[:, 1])
+
+    names = geolocation_service._zone_names
+    fees = geolocation_service._zone_fees
+
+    # Indice de zone sans branchement: premier seuil >= distance
+    indexes = np.searchsorted(geolocation_service._zone_thresholds, distances, side='left')
+
+    return [
+        {'distance': float(distance), 'zone': names[index], 'delivery_fee': fees[index]}
+        for distance, index in zip(distances.tolist(), indexes.tolist())
+    ]
+
 if __name__ == "__main__":
-    print("Service de géolocalisation opérationnel!")
\ No newline at end of file
+    print("Service de géolocalisation opérationnel!")
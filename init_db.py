@@ -5,27 +5,85 @@ Script d'initialisation de la base de données avec migrations
 import os
 import sys
 from flask import Flask
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from config import get_config
 from models import db
 import logging
 
+# Constructeurs INSERT ... ON CONFLICT DO NOTHING par dialecte
+_UPSERT_INSERTS = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert
+}
+
+# Configurations système par défaut (construites une seule fois)
+DEFAULT_CONFIGS = (
+    {'key': 'app_name', 'value': 'PassPrint', 'description': 'Nom de l\'application'},
+    {'key': 'app_version', 'value': '1.0.0', 'description': 'Version de l\'application'},
+    {'key': 'maintenance_mode', 'value': 'false', 'description': 'Mode maintenance'},
+    {'key': 'backup_frequency', 'value': 'daily', 'description': 'Fréquence des sauvegardes'}
+)
+
+# Produits de démonstration (construits une seule fois)
+DEMO_PRODUCTS = (
+    {
+        'name': 'Carte de visite standard',
+        'description': 'Carte de visite 300g couché mat',
+        'price': 25000,
+        'category': 'print',
+        'stock_quantity': 1000
+    },
+    {
+        'name': 'Flyer A5',
+        'description': 'Flyer A5 135g couché brillant',
+        'price': 15000,
+        'category': 'print',
+        'stock_quantity': 500
+    },
+    {
+        'name': 'Clé USB 32GB',
+        'description': 'Clé USB personnalisée 32GB',
+        'price': 85000,
+        'category': 'usb',
+        'stock_quantity': 50
+    }
+)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Journal WAL et synchronisation allégée pour l'initialisation SQLite"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
 def create_app():
     """Créer l'application Flask"""
     app = Flask(__name__)
     app.config.from_object(get_config())
     db.init_app(app)
+
+    # Réglages appliqués à chaque nouvelle connexion SQLite
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _sqlite_pragmas)
+
     return app
 
-def init_database():
+def init_database(migrated=False):
     """Initialiser la base de données avec les migrations"""
     app = create_app()
 
     with app.app_context():
         try:
-            # Créer les tables depuis les modèles (fallback)
-            print("📊 Création des tables depuis les modèles...")
-            db.create_all()
-            print("✅ Tables créées avec succès")
+            # Créer les tables depuis les modèles (fallback), sauf si Alembic a amené le schéma à sa tête
+            if not migrated:
+                print("📊 Création des tables depuis les modèles...")
+                db.create_all()
+                print("✅ Tables créées avec succès")
 
             # Insérer des données de base si nécessaire
             seed_database()
@@ -42,77 +100,93 @@ def seed_database():
     try:
         from models import User, Product, SystemConfig
 
-        # Vérifier si l'utilisateur admin existe déjà
-        admin_exists = User.query.filter_by(is_admin=True).first()
-        if not admin_exists:
-            # Créer un utilisateur admin par défaut
-            admin_user = User(
-                email='admin@passprint.com',
-                password_hash='$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LeehdBP6fEtTT2/Dm',  # 'password'
-                first_name='Admin',
-                last_name='PassPrint',
-                is_admin=True
-            )
-            db.session.add(admin_user)
-            print("👤 Utilisateur admin créé: admin@passprint.com / password")
-
-        # Ajouter des configurations système par défaut
-        default_configs = [
-            {'key': 'app_name', 'value': 'PassPrint', 'description': 'Nom de l\'application'},
-            {'key': 'app_version', 'value': '1.0.0', 'description': 'Version de l\'application'},
-            {'key': 'maintenance_mode', 'value': 'false', 'description': 'Mode maintenance'},
-            {'key': 'backup_frequency', 'value': 'daily', 'description': 'Fréquence des sauvegardes'},
-        ]
-
-        for config_data in default_configs:
-            config_exists = SystemConfig.query.filter_by(key=config_data['key']).first()
-            if not config_exists:
-                config = SystemConfig(**config_data)
-                db.session.add(config)
-
-        # Ajouter des produits de démonstration
-        demo_products = [
-            {
-                'name': 'Carte de visite standard',
-                'description': 'Carte de visite 300g couché mat',
-                'price': 25000,
-                'category': 'print',
-                'stock_quantity': 1000
-            },
-            {
-                'name': 'Flyer A5',
-                'description': 'Flyer A5 135g couché brillant',
-                'price': 15000,
-                'category': 'print',
-                'stock_quantity': 500
-            },
-            {
-                'name': 'Clé USB 32GB',
-                'description': 'Clé USB personnalisée 32GB',
-                'price': 85000,
-                'category': 'usb',
-                'stock_quantity': 50
+        # Une seule transaction explicite, sans flush automatique intermédiaire
+        with db.session.begin(), db.session.no_autoflush:
+            # Vérifier si l'utilisateur admin existe déjà
+            admin_exists = User.query.filter_by(is_admin=True).first()
+            if not admin_exists:
+                # Créer un utilisateur admin par défaut
+                admin_user = User(
+                    email='admin@passprint.com',
+                    password_hash='$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LeehdBP6fEtTT2/Dm',  # 'password'
+                    first_name='Admin',
+                    last_name='PassPrint',
+                    is_admin=True
+                )
+                db.session.add(admin_user)
+                print("👤 Utilisateur admin créé: admin@passprint.com / password")
+
+            # Ajouter des configurations système par défaut
+            # Clé unique: insertion native ignorant les conflits, sans SELECT préalable
+            upsert_insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+            if upsert_insert is not None:
+                db.session.execute(
+                    upsert_insert(SystemConfig).on_conflict_do_nothing(index_elements=['key']),
+                    list(DEFAULT_CONFIGS)
+                )
+            else:
+                # Une seule requête pour connaître les clés déjà présentes
+                config_keys = [config_data['key'] for config_data in DEFAULT_CONFIGS]
+                existing_keys = {
+                    key for (key,) in db.session.query(SystemConfig.key).filter(SystemConfig.key.in_(config_keys))
+                }
+
+                # Insertion groupée (executemany) des configurations manquantes
+                missing_configs = [
+                    config_data for config_data in DEFAULT_CONFIGS if config_data['key'] not in existing_keys
+                ]
+                if missing_configs:
+                    db.session.execute(insert(SystemConfig), missing_configs)
+
+            # Ajouter des produits de démonstration
+            # Pas de contrainte d'unicité sur le nom: vérification préalable en une requête
+            product_names = [product_data['name'] for product_data in DEMO_PRODUCTS]
+            existing_names = {
+                name for (name,) in db.session.query(Product.name).filter(Product.name.in_(product_names))
             }
-        ]
 
-        for product_data in demo_products:
-            product_exists = Product.query.filter_by(name=product_data['name']).first()
-            if not product_exists:
-                product = Product(**product_data)
-                db.session.add(product)
+            # Insertion groupée (executemany) des produits manquants
+            missing_products = [
+                product_data for product_data in DEMO_PRODUCTS if product_data['name'] not in existing_names
+            ]
+            if missing_products:
+                db.session.execute(insert(Product), missing_products)
 
-        db.session.commit()
         print("📦 Données de démonstration ajoutées")
 
     except Exception as e:
         print(f"⚠️  Erreur lors de l'ajout des données de base: {e}")
         db.session.rollback()
 
-def run_migrations():
+def run_migrations(app=None):
     """Exécuter les migrations Alembic"""
     try:
+        from alembic import command
+        from alembic.config import Config as AlembicConfig
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+
         print("🔄 Exécution des migrations...")
-        os.system('alembic upgrade head')
+
+        # Sans révision, l'upgrade ne ferait rien: ne pas le signaler comme un succès
+        alembic_config = AlembicConfig('alembic.ini')
+        heads = set(ScriptDirectory.from_config(alembic_config).get_heads())
+        if not heads:
+            print("❌ Aucune révision de migration trouvée")
+            return False
+
+        # API Alembic dans le processus courant, sur le moteur de l'application
+        app = app or create_app()
+        with app.app_context(), db.engine.begin() as connection:
+            alembic_config.attributes['connection'] = connection
+            command.upgrade(alembic_config, 'head')
+            current = set(MigrationContext.configure(connection).get_current_heads())
+
+        # Succès seulement si la base est réellement à la tête (init_database saute alors create_all)
+        if current != heads:
+            print(f"❌ Migrations incomplètes: révision {sorted(current)} au lieu de {sorted(heads)}")
+            return False
+
         print("✅ Migrations exécutées avec succès")
         return True
     except Exception as e:
@@ -133,12 +207,13 @@ def main():
 
     success = True
 
-    # Exécuter les migrations
-    if not run_migrations():
-        success = False
+    # Exécuter les migrations (en cas d'échec, les tables sont créées depuis les modèles)
+    migrated = run_migrations()
+    if not migrated:
+        print("⚠️  Migrations non appliquées, utilisation des modèles")
 
     # Initialiser la base de données
-    if not init_database():
+    if not init_database(migrated=migrated):
         success = False
 
     if success:
@@ -3,37 +3,189 @@
 Load balancer pour PassPrint
 Répartit la charge entre plusieurs serveurs
 """
+import asyncio
+import hashlib
+import os
 import random
+from bisect import bisect_left
+from itertools import cycle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List
 
+try:
+    import httpx
+    httpx_available = True
+except ImportError:
+    httpx_available = False
+
 class LoadBalancer:
     """Load balancer simple"""
 
     def __init__(self, servers: List[str]):
         self.servers = servers
-        self.current_index = 0
+
+        # Rotation round-robin: next() sur un cycle est atomique sous le GIL
+        self._cycle = cycle(servers)
+
+        # Anneau de hachage cohérent: 160 points virtuels par serveur
+        ring = sorted(
+            (self._hash(f"{server}#{replica}"), server)
+            for server in servers for replica in range(160)
+        )
+        self._ring_hashes = [point for point, _ in ring]
+        self._ring_servers = [server for _, server in ring]
+
+        # Cache de santé par serveur: (sain, expiration monotone); 0.0 = jamais sondé
+        self.health_ttl = float(os.getenv('LB_HEALTH_TTL_SEC', '2'))
+        self._health = {server: (True, 0.0) for server in servers}
+
+        # Une seule sonde en vol par serveur, partagée par tous les appelants
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # Moyenne mobile exponentielle du temps de réponse des sondes (secondes)
+        self._ewma = {server: 0.0 for server in servers}
+        self._refresh_thread = None
+        self._refresh_lock = threading.Lock()
+
+        # Session partagée: connexions keep-alive réutilisées entre les sondes
+        self._session = requests.Session()
+        self._session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+        # Sondes lancées en parallèle: latence ~ un timeout au lieu de len(servers) timeouts
+        self._pool = ThreadPoolExecutor(max_workers=len(servers), thread_name_prefix='lb-probe')
 
     def get_server(self) -> str:
         """Obtenir un serveur (round-robin)"""
-        server = self.servers[self.current_index]
-        self.current_index = (self.current_index + 1) % len(self.servers)
-        return server
+        return next(self._cycle)
 
-    def get_healthy_server(self) -> str:
-        """Obtenir un serveur sain"""
-        for _ in range(len(self.servers)):
-            server = self.get_server()
-            if self._check_health(server):
+    @staticmethod
+    def _hash(value: str) -> bytes:
+        """Empreinte stable d'une clé sur l'anneau"""
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+
+    def get_server_for(self, key: str) -> str:
+        """Obtenir le serveur attitré d'une clé (session, IP) par hachage cohérent"""
+        self._ensure_refresh_thread()
+
+        start = bisect_left(self._ring_hashes, self._hash(key))
+        ring_size = len(self._ring_servers)
+
+        # Parcourir l'anneau jusqu'au premier serveur sain selon le cache
+        now = time.monotonic()
+        for offset in range(ring_size):
+            server = self._ring_servers[(start + offset) % ring_size]
+            healthy, expires_at = self._health[server]
+            if now >= expires_at:
+                # Entrée expirée: relancer la sonde, n'attendre que si le serveur n'a jamais été sondé
+                future = self._submit_probe(server)
+                if expires_at == 0.0:
+                    healthy = future.result()
+            if healthy:
                 return server
+        return self._ring_servers[start % ring_size]
+
+    def get_healthy_server(self) -> str:
+        """Obtenir un serveur sain (deux choix aléatoires, le moins lent l'emporte)"""
+        self._ensure_refresh_thread()
+
+        # Entrées expirées: relancer (au plus) une sonde par serveur sans l'attendre
+        now = time.monotonic()
+        stale = [server for server in self.servers if now >= self._health[server][1]]
+        futures = {self._submit_probe(server): server for server in stale}
+
+        # Aucun état connu (premier appel): attendre le premier serveur sain qui répond
+        if futures and all(expires_at == 0.0 for _, expires_at in self._health.values()):
+            for future in as_completed(futures):
+                if future.result():
+                    # Les sondes restantes finissent en arrière-plan et alimentent le cache
+                    return futures[future]
+
+        healthy = [server for server in self.servers if self._health[server][0]]
+        if len(healthy) >= 2:
+            first, second = random.sample(healthy, 2)
+            return first if self._ewma[first] <= self._ewma[second] else second
+        if healthy:
+            return healthy[0]
         return self.servers[0]  # Fallback
 
+    def _submit_probe(self, server: str):
+        """Obtenir la sonde en vol d'un serveur, ou en lancer une nouvelle"""
+        with self._inflight_lock:
+            future = self._inflight.get(server)
+            if future is None or future.done():
+                future = self._pool.submit(self._probe, server)
+                self._inflight[server] = future
+            return future
+
+    def _probe(self, server: str) -> bool:
+        """Sonder un serveur et mettre à jour son entrée de cache"""
+        healthy = self._check_health(server)
+        self._health[server] = (healthy, time.monotonic() + self.health_ttl)
+        return healthy
+
+    def _ensure_refresh_thread(self):
+        """Démarrer à la première utilisation le rafraîchissement périodique en arrière-plan"""
+        if self._refresh_thread is not None:
+            return
+        with self._refresh_lock:
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(
+                    target=self._refresh_loop, name='lb-health-refresh', daemon=True
+                )
+                self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        """Sonder chaque serveur toutes les TTL/2 secondes"""
+        if httpx_available:
+            # Une boucle d'événements multiplexe toutes les sondes sur un seul thread
+            asyncio.run(self._async_refresh_loop())
+            return
+
+        # Cadence fixe: la durée des sondes ne s'ajoute pas à la période
+        period = self.health_ttl / 2
+        next_round = time.monotonic()
+        while True:
+            wait([self._submit_probe(server) for server in self.servers])
+            # Après un tour trop long, repartir de maintenant plutôt que rattraper le retard
+            next_round = max(next_round + period, time.monotonic())
+            time.sleep(max(0.0, next_round - time.monotonic()))
+
+    async def _async_refresh_loop(self):
+        """Rafraîchissement asynchrone avec un client httpx partagé"""
+        period = self.health_ttl / 2
+        next_round = time.monotonic()
+        async with httpx.AsyncClient(timeout=1.0) as client:
+            while True:
+                await asyncio.gather(*(self._async_probe(client, server) for server in self.servers))
+                next_round = max(next_round + period, time.monotonic())
+                await asyncio.sleep(max(0.0, next_round - time.monotonic()))
+
+    async def _async_probe(self, client, server: str) -> bool:
+        """Sonder un serveur de façon asynchrone et mettre à jour son entrée de cache"""
+        try:
+            response = await client.get(f"http://{server}/api/health", follow_redirects=False)
+            rtt = response.elapsed.total_seconds()
+            self._ewma[server] = 0.8 * self._ewma[server] + 0.2 * rtt
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+
+        self._health[server] = (healthy, time.monotonic() + self.health_ttl)
+        return healthy
+
     def _check_health(self, server: str) -> bool:
         """Vérifier la santé d'un serveur"""
         try:
-            response = requests.get(f"http://{server}/api/health", timeout=1)
+            response = self._session.get(f"http://{server}/api/health", timeout=1, allow_redirects=False)
+            rtt = response.elapsed.total_seconds()
+            self._ewma[server] = 0.8 * self._ewma[server] + 0.2 * rtt
             return response.status_code == 200
-        except:
+        except requests.RequestException:
             return False
 
 # Configuration load balancer
@@ -43,9 +195,11 @@ load_balancer = LoadBalancer([
     'localhost:5002'
 ])
 
-def get_server():
-    """Obtenir un serveur disponible"""
+def get_server(key: str = None):
+    """Obtenir un serveur disponible (attitré si une clé de routage est fournie)"""
+    if key is not None:
+        return load_balancer.get_server_for(key)
     return load_balancer.get_healthy_server()
 
 if __name__ == "__main__":
-    print("Load balancer opérationnel!")
\ No newline at end of file
+    print("Load balancer opérationnel!")
@@ -10,13 +10,68 @@ from datetime import datetime
 from pathlib import Path
 import json
 import sys
+import time
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+# Processus courant mesuré par PerformanceLogger (handle /proc ouvert une seule fois)
+try:
+    import psutil
+    _PROC = psutil.Process()
+except ImportError:
+    _PROC = None
+
+def _json_default(value):
+    """Sérialiser les dates en ISO 8601 et le reste en texte"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _dumps(entry: dict) -> str:
+    """Encoder une entrée de log en JSON (orjson si disponible, dates sérialisées nativement)"""
+    if orjson_available:
+        return orjson.dumps(entry, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS, default=str).decode()
+    return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+# Attributs optionnels des enregistrements: (attribut du LogRecord, clé JSON)
+_OPTIONAL_KEYS = (
+    # Informations de sécurité
+    ('user_id', 'user_id'),
+    ('ip_address', 'ip_address'),
+    ('user_agent', 'user_agent'),
+    ('resource_type', 'resource_type'),
+    ('resource_id', 'resource_id'),
+    # Métriques de performance
+    ('duration', 'duration_ms'),
+    ('memory_usage', 'memory_mb'),
+    ('cpu_usage', 'cpu_percent')
+)
+
+# Champs des événements de sécurité: (clé JSON, attribut du LogRecord, valeur par défaut)
+# Un attribut None désigne le message de l'enregistrement
+_SECURITY_FIELDS = (
+    ('event_type', 'event_type', 'security_event'),
+    ('user_id', 'user_id', None),
+    ('action', 'action', 'unknown'),
+    ('details', None, None),
+    ('ip_address', 'ip_address', None),
+    ('user_agent', 'user_agent', None),
+    ('resource_type', 'resource_type', None),
+    ('resource_id', 'resource_id', None),
+    ('status', 'status', 'unknown'),
+    ('severity', 'severity', 'medium')
+)
 
 class JSONFormatter(logging.Formatter):
     """Formatter JSON pour les logs structurés"""
 
     def format(self, record):
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': datetime.utcnow(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -27,50 +82,28 @@ class JSONFormatter(logging.Formatter):
             'process': record.process
         }
 
-        # Ajouter les informations de sécurité si disponibles
-        if hasattr(record, 'user_id'):
-            log_entry['user_id'] = record.user_id
-        if hasattr(record, 'ip_address'):
-            log_entry['ip_address'] = record.ip_address
-        if hasattr(record, 'user_agent'):
-            log_entry['user_agent'] = record.user_agent
-        if hasattr(record, 'resource_type'):
-            log_entry['resource_type'] = record.resource_type
-        if hasattr(record, 'resource_id'):
-            log_entry['resource_id'] = record.resource_id
-
-        # Ajouter les métriques de performance si disponibles
-        if hasattr(record, 'duration'):
-            log_entry['duration_ms'] = record.duration
-        if hasattr(record, 'memory_usage'):
-            log_entry['memory_mb'] = record.memory_usage
-        if hasattr(record, 'cpu_usage'):
-            log_entry['cpu_percent'] = record.cpu_usage
+        # Ajouter les informations de sécurité et de performance si disponibles
+        attributes = record.__dict__
+        for attribute, key in _OPTIONAL_KEYS:
+            value = attributes.get(attribute)
+            if value is not None:
+                log_entry[key] = value
 
         # Ajouter les informations d'erreur si disponibles
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
 
-        return json.dumps(log_entry, ensure_ascii=False)
+        return _dumps(log_entry)
 
 class SecurityFormatter(logging.Formatter):
     """Formatter spécialisé pour les événements de sécurité"""
 
     def format(self, record):
-        return json.dumps({
-            'timestamp': datetime.utcnow().isoformat(),
-            'level': 'SECURITY',
-            'event_type': getattr(record, 'event_type', 'security_event'),
-            'user_id': getattr(record, 'user_id', None),
-            'action': getattr(record, 'action', 'unknown'),
-            'details': record.getMessage(),
-            'ip_address': getattr(record, 'ip_address', None),
-            'user_agent': getattr(record, 'user_agent', None),
-            'resource_type': getattr(record, 'resource_type', None),
-            'resource_id': getattr(record, 'resource_id', None),
-            'status': getattr(record, 'status', 'unknown'),
-            'severity': getattr(record, 'severity', 'medium')
-        }, ensure_ascii=False)
+        attributes = record.__dict__
+        entry = {'timestamp': datetime.utcnow(), 'level': 'SECURITY'}
+        for key, attribute, default in _SECURITY_FIELDS:
+            entry[key] = record.getMessage() if attribute is None else attributes.get(attribute, default)
+        return _dumps(entry)
 
 def setup_logging(app=None):
     """Configurer le système de logging complet"""
@@ -224,48 +257,39 @@ def log_security_event(action: str, details: str, user_id: str = None,
                       status: str = 'success', severity: str = 'medium'):
     """Fonction utilitaire pour logger les événements de sécurité"""
     security_logger = logging.getLogger('security')
-
-    # Créer un objet log avec les attributs personnalisés
-    class SecurityLogRecord(logging.LogRecord):
-        def __init__(self, action, details, user_id, ip_address, user_agent,
-                     resource_type, resource_id, status, severity):
-            super().__init__(
-                name='security', level=logging.INFO, pathname='', lineno=0,
-                msg=details, args=(), exc_info=None
-            )
-            self.action = action
-            self.user_id = user_id
-            self.ip_address = ip_address
-            self.user_agent = user_agent
-            self.resource_type = resource_type
-            self.resource_id = resource_id
-            self.status = status
-            self.severity = severity
-
-    # Créer et logger l'enregistrement
-    record = SecurityLogRecord(action, details, user_id, ip_address, user_agent,
-                              resource_type, resource_id, status, severity)
+    if not security_logger.isEnabledFor(logging.INFO):
+        return
+
+    # Créer l'enregistrement puis y attacher les attributs personnalisés
+    record = security_logger.makeRecord('security', logging.INFO, '', 0, details, (), None)
+    record.__dict__.update({
+        'action': action,
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'resource_type': resource_type,
+        'resource_id': resource_id,
+        'status': status,
+        'severity': severity
+    })
     security_logger.handle(record)
 
 def log_api_request(endpoint: str, method: str, status_code: int, duration: float = None,
                    user_id: str = None, ip_address: str = None):
     """Logger une requête API"""
     logger = logging.getLogger('api')
-
-    class APIRequestRecord(logging.LogRecord):
-        def __init__(self, endpoint, method, status_code, duration, user_id, ip_address):
-            super().__init__(
-                name='api', level=logging.INFO, pathname='', lineno=0,
-                msg=f'{method} {endpoint} - {status_code}', args=(), exc_info=None
-            )
-            self.endpoint = endpoint
-            self.method = method
-            self.status_code = status_code
-            self.duration = duration
-            self.user_id = user_id
-            self.ip_address = ip_address
-
-    record = APIRequestRecord(endpoint, method, status_code, duration, user_id, ip_address)
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
+    record = logger.makeRecord('api', logging.INFO, '', 0, f'{method} {endpoint} - {status_code}', (), None)
+    record.__dict__.update({
+        'endpoint': endpoint,
+        'method': method,
+        'status_code': status_code,
+        'duration': duration,
+        'user_id': user_id,
+        'ip_address': ip_address
+    })
     logger.handle(record)
 
 def log_database_operation(operation: str, table: str, duration: float = None,
@@ -273,20 +297,18 @@ def log_database_operation(operation: str, table: str, duration: float = None,
     """Logger une opération de base de données"""
     logger = logging.getLogger('database')
 
-    class DatabaseLogRecord(logging.LogRecord):
-        def __init__(self, operation, table, duration, records_affected, error):
-            level = logging.ERROR if error else logging.INFO
-            super().__init__(
-                name='database', level=level, pathname='', lineno=0,
-                msg=f'{operation} on {table}', args=(), exc_info=None
-            )
-            self.operation = operation
-            self.table = table
-            self.duration = duration
-            self.records_affected = records_affected
-            self.error = error
-
-    record = DatabaseLogRecord(operation, table, duration, records_affected, error)
+    level = logging.ERROR if error else logging.INFO
+    if not logger.isEnabledFor(level):
+        return
+
+    record = logger.makeRecord('database', level, '', 0, f'{operation} on {table}', (), None)
+    record.__dict__.update({
+        'operation': operation,
+        'table': table,
+        'duration': duration,
+        'records_affected': records_affected,
+        'error': error
+    })
     logger.handle(record)
 
 # Classe de contexte pour mesurer les performances
@@ -298,37 +320,39 @@ class PerformanceLogger:
         self.logger = logging.getLogger(logger_name)
         self.start_time = None
         self.start_memory = None
+        self.duration = None
 
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.monotonic_ns()
 
-        # Mesurer la mémoire si psutil est disponible
-        try:
-            import psutil
-            process = psutil.Process()
-            self.start_memory = process.memory_info().rss / 1024 / 1024  # MB
-        except ImportError:
-            pass
+        # Mesurer la mémoire si psutil est disponible (inutile si le log sera filtré)
+        if not self.logger.isEnabledFor(logging.INFO):
+            return self
+        self.start_memory = (_PROC.memory_info().rss >> 20) if _PROC else None  # MB
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duration = time.time() - self.start_time
+        duration_ns = time.monotonic_ns() - self.start_time
+        duration_ms = duration_ns / 1_000_000
+        self.duration = duration_ms / 1000
+
+        # Rien à construire si le niveau est filtré
+        level = logging.ERROR if exc_type else logging.INFO
+        if not self.logger.isEnabledFor(level):
+            return
 
         # Créer l'enregistrement de log
-        class PerformanceLogRecord(logging.LogRecord):
-            def __init__(self, operation, duration, memory_usage, exc_type):
-                level = logging.ERROR if exc_type else logging.INFO
-                super().__init__(
-                    name='app', level=level, pathname='', lineno=0,
-                    msg=f'{operation} completed in {duration:.3f}s', args=(), exc_info=(exc_type, exc_val, exc_tb)
-                )
-                self.operation = operation
-                self.duration = duration * 1000  # Convertir en millisecondes
-                self.memory_usage = memory_usage
-                self.error = exc_type is not None
-
-        record = PerformanceLogRecord(self.operation, duration, self.start_memory, exc_type)
+        exc_info = (exc_type, exc_val, exc_tb) if exc_type else None
+        record = self.logger.makeRecord(
+            'app', level, '', 0, f'{self.operation} completed in {self.duration:.3f}s', (), exc_info
+        )
+        record.__dict__.update({
+            'operation': self.operation,
+            'duration': duration_ms,
+            'memory_usage': self.start_memory,
+            'error': exc_type is not None
+        })
         self.logger.handle(record)
 
 # Fonction utilitaire pour créer des loggers personnalisés
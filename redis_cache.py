@@ -23,6 +23,7 @@ class CacheManager:
         self.app = app
         self.redis_client = None
         self.memory_cache = {}  # Cache mémoire de secours
+        self.generation = 0  # Incrémentée à chaque invalidation globale
 
         # Configuration
         self.default_ttl = int(os.getenv('CACHE_TTL', '300'))  # 5 minutes
@@ -182,6 +183,7 @@ class CacheManager:
                 for key in keys_to_delete:
                     del self.memory_cache[key]
 
+            self.generation += 1
             logger.info(f"Cache namespace '{namespace}' vidé")
             return True
 
@@ -203,6 +205,7 @@ class CacheManager:
             if self.cache_levels['memory']['enabled']:
                 self.memory_cache.clear()
 
+            self.generation += 1
             logger.info("Tout le cache vidé")
             return True
 
@@ -278,7 +281,12 @@ class CacheManager:
 
         if self.redis_client:
             try:
-                info = self.redis_client.info()
+                # Un seul aller-retour réseau pour toutes les sondes
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.info()
+                pipe.keys(f"{self.cache_levels['redis']['prefix']}*")
+                info, keys = pipe.execute()
+
                 stats['redis_cache'].update({
                     'total_commands': info.get('total_commands_processed', 0),
                     'keyspace_hits': info.get('keyspace_hits', 0),
@@ -286,7 +294,7 @@ class CacheManager:
                     'memory_used': info.get('used_memory_human', '0B'),
                     'uptime_days': info.get('uptime_in_days', 0),
                     'connected_clients': info.get('connected_clients', 0),
-                    'keys_count': len(self.redis_client.keys(f"{self.cache_levels['redis']['prefix']}*"))
+                    'keys_count': len(keys)
                 })
             except Exception as e:
                 stats['redis_cache']['error'] = str(e)
@@ -235,6 +235,40 @@ class TestDisasterRecovery:
         assert disaster_info['severity'] in ['critical', 'high']
         assert len(disaster_info['indicators']) > 0
 
+    def test_disaster_detection_cache(self, app):
+        """Test de la réutilisation de la détection pour des signaux stables"""
+        from disaster_recovery import DisasterRecoveryManager
+
+        recovery_manager = DisasterRecoveryManager(app)
+        recovery_manager._res_threshold = 95.0
+
+        metrics = {'system': {'cpu': {'percent': 50.2}}}
+        first = recovery_manager.detect_disaster(metrics)
+
+        # Variation sans franchissement de seuil: résultat réutilisé
+        metrics['system']['cpu']['percent'] = 94.7
+        assert recovery_manager.detect_disaster(metrics)['timestamp'] == first['timestamp']
+
+        # Franchissement de seuil, même de quelques dixièmes: nouvelle évaluation
+        metrics['system']['cpu']['percent'] = 95.3
+        disaster_info = recovery_manager.detect_disaster(metrics)
+        assert 'high_cpu_usage' in disaster_info['indicators']
+
+    def test_consecutive_detections_gate_recovery(self, app):
+        """Test du filtrage des pics isolés avant récupération"""
+        from disaster_recovery import DisasterRecoveryManager
+
+        recovery_manager = DisasterRecoveryManager(app)
+        recovery_manager._consec_min = 2
+
+        metrics = {'database': {'stats': {'connection_healthy': False}}}
+        assert recovery_manager.detect_disaster(metrics)['should_recover'] is False
+        assert recovery_manager.detect_disaster(metrics)['should_recover'] is True
+
+        # Retour à la normale: compteur remis à zéro
+        assert recovery_manager.detect_disaster({})['should_recover'] is False
+        assert recovery_manager.detect_disaster(metrics)['consecutive_detections'] == 1
+
     def test_recovery_scripts_creation(self, app):
         """Test de création des scripts de récupération"""
         from disaster_recovery import DisasterRecoveryManager